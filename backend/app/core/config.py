@@ -28,6 +28,58 @@ class Settings(BaseSettings):
     OPENAI_MAX_TOKENS: int = 4096
     OPENAI_TEMPERATURE: float = 0.0
 
+    # LLM client timeouts (seconds)
+    LLM_REQUEST_TIMEOUT: float = 60.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    # Narratives fall back to a template on timeout, so they can give up sooner
+    NARRATIVE_REQUEST_TIMEOUT: float = 45.0
+    # SDK retries (with exponential backoff) on timeouts, 429s and 5xx
+    LLM_MAX_RETRIES: int = 2
+    # In-flight narrative calls per process; size to the account's rate limits
+    NARRATIVE_MAX_CONCURRENT_REQUESTS: int = 50
+
+    # Shared LLM HTTP connection pool (per provider, per process)
+    LLM_MAX_CONNECTIONS: int = 2000
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 500
+
+    # Output budget for the intent JSON from LLMSQLGenerator (well above its
+    # typical size; the generic *_MAX_TOKENS above are for the question parser)
+    LLM_SQL_MAX_TOKENS: int = 1500
+
+    # Narrative generation is a short formatting task, so it runs on a
+    # smaller model with a tight output budget (one sentence + 2-3 sentences)
+    ANTHROPIC_NARRATIVE_MODEL: str = "claude-3-5-haiku-20241022"
+    OPENAI_NARRATIVE_MODEL: str = "gpt-4o-mini"
+    NARRATIVE_MAX_TOKENS: int = 400
+
+    # Comma-separated anthropic-beta features to request (e.g. a latency-
+    # optimized mode on models that support it); unset sends no header
+    ANTHROPIC_BETA_FEATURES: Optional[str] = None
+
+    # Anthropic prompt cache TTL for the system prompt: "5m" (default cache)
+    # or "1h" (extended-cache-ttl beta), and how long the cache may sit idle
+    # before a keepalive request refreshes it (seconds, 0 disables)
+    ANTHROPIC_PROMPT_CACHE_TTL: str = "1h"
+    ANTHROPIC_CACHE_KEEPALIVE_INTERVAL: float = 3000.0
+    # Keepalive refreshes sent after the last real request before the
+    # keepalive stops (it resumes with the next request)
+    ANTHROPIC_CACHE_KEEPALIVE_MAX_IDLE_REFRESHES: int = 1
+
+    # LLM response cache (entries per generator instance)
+    LLM_RESPONSE_CACHE_SIZE: int = 512
+    # Lifetime of responses persisted in the SQLite response cache (seconds,
+    # 0 disables the persistent tier)
+    LLM_RESPONSE_CACHE_TTL: int = 86400
+    # Database of the persistent tier; kept apart from the data database so
+    # cache writes do not change its mtime (which keys the query result cache)
+    LLM_RESPONSE_CACHE_URL: str = "sqlite:///./llm_response_cache.db"
+
+    # Message Batches API polling interval (seconds)
+    LLM_BATCH_POLL_INTERVAL: float = 5.0
+
+    # Worker threads for blocking pipeline work (asyncio default executor)
+    WORKER_THREADS: int = 64
+
     # Database
     DATABASE_URL: str = "sqlite:///./tellius_feed.db"
 
@@ -42,6 +94,16 @@ class Settings(BaseSettings):
     # Query Limits
     MAX_QUERY_ROWS: int = 1000000
     QUERY_TIMEOUT: int = 30  # seconds
+    # Query worker threads per TQLAdapter; each keeps one SQLite connection
+    TQL_MAX_CONNECTIONS: int = 16
+    # Query result cache (entries per adapter, 0 disables); entries are keyed
+    # on the database file mtime so any write invalidates them
+    QUERY_RESULT_CACHE_SIZE: int = 512
+    # Generated TQL plans kept per process, keyed on intent + Business View
+    TQL_PLAN_CACHE_SIZE: int = 512
+    # Plan against a BV's denormalized fact table (no joins) when it has the
+    # needed columns; the table must exist in the database
+    TQL_PREFER_DENORMALIZED: bool = False
 
     # Deep Insight Configuration
     MAX_DRIVERS_TO_ANALYZE: int = 20
@@ -5,6 +5,10 @@ import logging
 import sys
 from .config import settings
 
+# Whether debug events pass the level filter; hot paths check this before
+# building payloads that would otherwise be computed and then dropped
+DEBUG_ENABLED = getattr(logging, settings.LOG_LEVEL) <= logging.DEBUG
+
 
 def setup_logging():
     """Configure structured logging for the application."""
@@ -1,7 +1,10 @@
 """FastAPI application for Intelligent Feed system."""
 
+import asyncio
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -11,6 +14,7 @@ import json
 
 from app.models.response import InsightRequest, InsightResponse, HealthResponse, ErrorResponse
 from app.services.orchestrator import IntelligentFeedOrchestrator
+from app.services.llm_clients import close_async_clients
 from app.utils.sample_business_view import SAMPLE_BUSINESS_VIEW
 from app.utils.pharma_business_view import PHARMA_BUSINESS_VIEW
 from app.core.config import settings
@@ -125,6 +129,7 @@ def get_orchestrator(bv_name: str = None) -> IntelligentFeedOrchestrator:
                 business_view=PHARMA_BUSINESS_VIEW,
                 db_path="sqlite:///./tellius_feed.db",
             )
+            orchestrators[key].llm_sql_generator.start_cache_keepalive()
             logger.info("orchestrator_created", bv_name="pharma")
         return orchestrators[key]
     else:
@@ -134,6 +139,7 @@ def get_orchestrator(bv_name: str = None) -> IntelligentFeedOrchestrator:
                 business_view=SAMPLE_BUSINESS_VIEW,
                 db_path="sqlite:///./tellius_feed.db",
             )
+            orchestrators[key].llm_sql_generator.start_cache_keepalive()
             logger.info("orchestrator_created", bv_name="ecommerce")
         return orchestrators[key]
 
@@ -145,11 +151,19 @@ async def lifespan(app: FastAPI):
 
     logger.info("application_starting", version=settings.VERSION)
 
+    # Blocking pipeline work (SQLite, pandas, ARIMA, charts) runs through
+    # asyncio.to_thread; size its pool so concurrent requests do not queue
+    # behind the interpreter's small default
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.WORKER_THREADS, thread_name_prefix="pipeline")
+    )
+
     # Initialize default orchestrator (E-commerce)
     orchestrators["ecommerce"] = IntelligentFeedOrchestrator(
         business_view=SAMPLE_BUSINESS_VIEW,
         db_path="sqlite:///./tellius_feed.db",
     )
+    orchestrators["ecommerce"].llm_sql_generator.start_cache_keepalive()
 
     logger.info("application_started")
 
@@ -160,6 +174,7 @@ async def lifespan(app: FastAPI):
     for key, orch in orchestrators.items():
         if orch:
             orch.close()
+    await close_async_clients()
     logger.info("application_stopped")
 
 
@@ -169,6 +184,8 @@ app = FastAPI(
     description="Next-generation question-driven insight engine with deep root-cause analysis",
     version=settings.VERSION,
     lifespan=lifespan,
+    # orjson serializes the nested evidence/chart payloads in C
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -5,6 +5,8 @@ from .business_view import (
     Table,
     Column,
     Join,
+    Rollup,
+    DenormalizedTable,
     Measure,
     Dimension,
     TimeDimension,
@@ -45,6 +47,8 @@ __all__ = [
     "Table",
     "Column",
     "Join",
+    "Rollup",
+    "DenormalizedTable",
     "Measure",
     "Dimension",
     "TimeDimension",
@@ -1,7 +1,9 @@
 """Business View model - Tellius compatible schema representation."""
 
-from typing import List, Optional
-from pydantic import BaseModel, Field
+import hashlib
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 
 
@@ -63,6 +65,31 @@ class Join(BaseModel):
     join_type: JoinType = JoinType.INNER
 
 
+class Rollup(BaseModel):
+    """
+    Pre-aggregated copy of a fact table.
+
+    Holds one row per distinct combination of key_columns, with each of
+    summed_columns summed, under the fact table's column names.
+    """
+    table: str
+    source_table: str
+    key_columns: List[str]
+    summed_columns: List[str]
+
+
+class DenormalizedTable(BaseModel):
+    """
+    Copy of a fact table with dimension columns joined in.
+
+    Keeps every fact column under its own name; `columns` maps each copied
+    dimension column ("product_dim.category") to its name on `table`.
+    """
+    table: str
+    source_table: str
+    columns: Dict[str, str]
+
+
 class Measure(BaseModel):
     """Represents a calculated measure/metric."""
     name: str
@@ -139,8 +166,59 @@ class BusinessView(BaseModel):
     dimensions: List[Dimension]
     time_dimension: TimeDimension
     calendar_rules: CalendarRules = Field(default_factory=CalendarRules)
+    rollups: List[Rollup] = Field(default_factory=list)
+    denormalized_tables: List[DenormalizedTable] = Field(default_factory=list)
     description: Optional[str] = None
 
+    # Memo for version_hash()
+    _version_hash: Optional[str] = PrivateAttr(default=None)
+
+    @cached_property
+    def join_adjacency(self) -> Dict[str, List[Tuple[str, Join]]]:
+        """
+        Table -> [(neighbor table, join)], in both directions of each join.
+
+        Built on first use; Business Views are not edited after loading, so
+        the index is kept for the life of the object.
+        """
+        adjacency: Dict[str, List[Tuple[str, Join]]] = {}
+        for join in self.joins:
+            adjacency.setdefault(join.left_table, []).append((join.right_table, join))
+            adjacency.setdefault(join.right_table, []).append((join.left_table, join))
+        return adjacency
+
+    def tables_reachable_from(self, table: str) -> Set[str]:
+        """All tables connected to `table` through joins, including itself."""
+        adjacency = self.join_adjacency
+        reachable = {table}
+        stack = [table]
+        while stack:
+            for neighbor, _ in adjacency.get(stack.pop(), ()):
+                if neighbor not in reachable:
+                    reachable.add(neighbor)
+                    stack.append(neighbor)
+        return reachable
+
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False) -> "BusinessView":
+        """Copy the model without the memoized join_adjacency and version hash."""
+        copied = super().model_copy(update=update, deep=deep)
+        copied.__dict__.pop("join_adjacency", None)
+        copied._version_hash = None
+        return copied
+
+    def version_hash(self) -> str:
+        """
+        Hash of the full Business View definition.
+
+        Computed on first use and kept, like join_adjacency: Business Views
+        are not edited after loading.
+        """
+        if self._version_hash is None:
+            self._version_hash = hashlib.blake2b(
+                self.model_dump_json().encode(), digest_size=16
+            ).hexdigest()
+        return self._version_hash
+
     def get_table(self, table_name: str) -> Optional[Table]:
         """Get table by name."""
         for table in self.tables:
@@ -1,5 +1,6 @@
 """Deep insight models - outputs from RCA and contribution analysis."""
 
+from functools import cached_property
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 import pandas as pd
@@ -78,6 +79,11 @@ class DeepInsight(BaseModel):
             reverse=True
         )[:n]
 
+    @cached_property
+    def top_drivers_as_dicts(self) -> List[dict]:
+        """Drivers ranked by absolute impact, serialized once for reuse."""
+        return [d.to_dict() for d in self.get_top_n_drivers(len(self.top_drivers))]
+
     def get_drivers_by_dimension(self, dimension: str) -> List[Driver]:
         """Get drivers for a specific dimension."""
         return [d for d in self.top_drivers if d.dimension == dimension]
@@ -111,13 +117,32 @@ class DeepInsight(BaseModel):
 
     def to_summary_dict(self) -> dict:
         """Convert to summary dictionary for API response."""
+        positive_drivers = negative_drivers = 0
+        for d in self.top_drivers:
+            if d.impact > 0:
+                positive_drivers += 1
+            elif d.impact < 0:
+                negative_drivers += 1
+
         return {
             "explainability_score": self.explainability_score,
             "driver_count": len(self.top_drivers),
-            "positive_drivers": len(self.get_positive_drivers()),
-            "negative_drivers": len(self.get_negative_drivers()),
+            "positive_drivers": positive_drivers,
+            "negative_drivers": negative_drivers,
             "total_positive_impact": self.total_positive_impact,
             "total_negative_impact": self.total_negative_impact,
             "net_impact": self.net_impact,
-            "primary_driver": self.get_primary_driver().to_dict() if self.get_primary_driver() else None,
+            "primary_driver": self.top_drivers_as_dicts[0] if self.top_drivers else None,
+        }
+
+    def materialize_evidence(self, top_n: int = 10) -> dict:
+        """
+        Driver evidence for the API response.
+
+        The ranked driver dicts are shared with the summary's primary driver
+        rather than serialized again.
+        """
+        return {
+            "drivers": self.top_drivers_as_dicts[:top_n],
+            "insight_summary": self.to_summary_dict(),
         }
@@ -227,6 +227,29 @@ class ParsedIntent(BaseModel):
             return None
         return self.baseline.compute_dates(self.time_range)
 
+    def cache_key(self) -> tuple:
+        """
+        Hashable identity of the intent, for memoizing work derived from it.
+
+        Filters are sorted by dimension; the order of a list filter's values
+        is kept since it is rendered into SQL as given.
+        """
+        return (
+            self.metric,
+            self.time_range.start_date,
+            self.time_range.end_date,
+            self.time_range.granularity,
+            tuple(sorted(
+                (dimension, tuple(values) if isinstance(values, list) else values)
+                for dimension, values in self.filters.items()
+            )),
+            (self.baseline.type, self.baseline.start_date, self.baseline.end_date)
+            if self.baseline else None,
+            self.feed_type,
+            self.threshold,
+            self.threshold_config.model_dump_json() if self.threshold_config else None,
+        )
+
     def to_dict(self) -> dict:
         """Convert to dictionary for logging/debugging."""
         return {
@@ -1,7 +1,7 @@
 """TQL Plan models - SQL query plans for execution."""
 
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
 
 
 class PlanMetadata(BaseModel):
@@ -33,6 +33,10 @@ class TQLPlan(BaseModel):
     # Baseline dimensional breakdown for contribution shift analysis
     baseline_dimensional_breakdown_query: Optional[str] = None
 
+    # Bound values for the "?" placeholders of each query, by query name
+    # (see get_all_queries); queries without an entry take no parameters
+    params: Dict[str, List[Any]] = Field(default_factory=dict)
+
     # Metadata
     metadata: PlanMetadata = PlanMetadata()
 
@@ -59,6 +63,10 @@ class TQLPlan(BaseModel):
 
         return queries
 
+    def get_params(self, query_name: str) -> tuple:
+        """Parameters to bind for the named query."""
+        return tuple(self.params.get(query_name, ()))
+
     def requires_baseline(self) -> bool:
         """Check if baseline comparison is included."""
         return self.baseline_period_query is not None
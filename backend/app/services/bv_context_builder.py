@@ -1,11 +1,21 @@
 """Business View Context Builder - Extracts schema and metadata for LLM grounding."""
 
-from typing import Dict, List, Set
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import AbstractSet, Dict, FrozenSet, List, Optional
 from app.models.business_view import BusinessView
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Contexts by Business View version hash, for callers that rebuild per request
+_CONTEXT_CACHE_SIZE = 64
+_context_cache: "OrderedDict[str, BVContext]" = OrderedDict()
+_context_cache_lock = threading.Lock()
+
 
 class BVContext:
     """Structured context extracted from Business View."""
@@ -13,18 +23,87 @@ class BVContext:
     def __init__(
         self,
         schema_context: str,
-        allowed_columns: Set[str],
+        allowed_columns: AbstractSet[str],
         join_graph: Dict[str, List[str]],
         measures_info: Dict[str, Dict],
         dimensions_info: Dict[str, Dict],
         time_info: Dict,
+        business_view: Optional[BusinessView] = None,
     ):
         self.schema_context = schema_context
-        self.allowed_columns = allowed_columns
+        # Frozen: shared read-only by every validation against this BV
+        self.allowed_columns: FrozenSet[str] = frozenset(allowed_columns)
         self.join_graph = join_graph
         self.measures_info = measures_info
         self.dimensions_info = dimensions_info
         self.time_info = time_info
+        # Source Business View, for planning queries against it
+        self.business_view = business_view
+        self._version_hash: Optional[str] = None
+
+    @cached_property
+    def measures_by_lower_name(self) -> Dict[str, str]:
+        """Lower-cased measure name (also with spaces for underscores) -> measure name."""
+        lookup = {name.lower().replace("_", " "): name for name in self.measures_info}
+        lookup.update((name.lower(), name) for name in self.measures_info)
+        return lookup
+
+    @cached_property
+    def formatted_measures(self) -> str:
+        """Measures as prompt lines: '  - name: expression'."""
+        return "\n".join(
+            f"  - {name}: {info['expression']}" for name, info in self.measures_info.items()
+        )
+
+    @cached_property
+    def formatted_dimensions(self) -> str:
+        """Dimensions as prompt lines: '  - name: table.column'."""
+        return "\n".join(
+            f"  - {name}: {info['table']}.{info['column']}" for name, info in self.dimensions_info.items()
+        )
+
+    @cached_property
+    def formatted_dimension_names(self) -> str:
+        """Dimension names as prompt lines: '  - name'."""
+        return "\n".join(f"  - {name}" for name in self.dimensions_info)
+
+    @cached_property
+    def allowed_column_suffixes(self) -> FrozenSet[str]:
+        """
+        Every trailing part of the allowed names after a ".".
+
+        "sales_fact.revenue" contributes "revenue"; lets validators accept
+        unqualified references with a set lookup.
+        """
+        suffixes = set()
+        for name in self.allowed_columns:
+            index = name.find(".")
+            while index != -1:
+                suffixes.add(name[index + 1:])
+                index = name.find(".", index + 1)
+        return frozenset(suffixes)
+
+    def version_hash(self) -> str:
+        """
+        Stable hash of the BV-derived metadata.
+
+        Two contexts built from the same Business View hash identically, so
+        this can be used as a cache key component.
+        """
+        if self._version_hash is None:
+            payload = json.dumps(
+                [
+                    self.schema_context,
+                    sorted(self.allowed_columns),
+                    self.measures_info,
+                    self.dimensions_info,
+                    self.time_info,
+                ],
+                sort_keys=True,
+                default=str,
+            )
+            self._version_hash = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+        return self._version_hash
 
 
 class BVContextBuilder:
@@ -63,8 +142,36 @@ class BVContextBuilder:
             measures_info=measures_info,
             dimensions_info=dimensions_info,
             time_info=time_info,
+            business_view=business_view,
         )
 
+    @staticmethod
+    def build_cached(business_view: BusinessView, version_hash: Optional[str] = None) -> BVContext:
+        """
+        Same as build(), but reuses the context of an identical Business View.
+
+        Args:
+            business_view: The Business View object
+            version_hash: business_view.version_hash(), if the caller has it
+
+        Returns:
+            BVContext shared with other callers (read-only)
+        """
+        if version_hash is None:
+            version_hash = business_view.version_hash()
+        with _context_cache_lock:
+            context = _context_cache.get(version_hash)
+            if context is not None:
+                _context_cache.move_to_end(version_hash)
+                return context
+
+        context = BVContextBuilder.build(business_view)
+        with _context_cache_lock:
+            _context_cache[version_hash] = context
+            if len(_context_cache) > _CONTEXT_CACHE_SIZE:
+                _context_cache.popitem(last=False)
+        return context
+
     @staticmethod
     def _build_schema_context(bv: BusinessView) -> str:
         """
@@ -123,7 +230,7 @@ class BVContextBuilder:
         return "\n".join(context_parts)
 
     @staticmethod
-    def _extract_allowed_columns(bv: BusinessView) -> Set[str]:
+    def _extract_allowed_columns(bv: BusinessView) -> FrozenSet[str]:
         """
         Extract set of all allowed fully-qualified column names.
 
@@ -149,7 +256,7 @@ class BVContextBuilder:
         # Add time dimension
         allowed.add(f"{bv.time_dimension.table}.{bv.time_dimension.column}")
 
-        return allowed
+        return frozenset(allowed)
 
     @staticmethod
     def _build_join_graph(bv: BusinessView) -> Dict[str, List[str]]:
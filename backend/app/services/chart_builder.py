@@ -334,25 +334,69 @@ class ChartBuilderService:
         """
         logger.info("building_all_charts", metric=metric_name)
 
-        charts = []
+        charts = ChartBuilderService.build_trend_charts(
+            metric_name=metric_name,
+            current_timeseries=current_timeseries,
+            baseline_timeseries=baseline_timeseries,
+            detection_result=detection_result,
+        )
+        charts.extend(ChartBuilderService.build_driver_charts(
+            metric_name=metric_name,
+            baseline_timeseries=baseline_timeseries,
+            deep_insight=deep_insight,
+        ))
+
+        logger.info("all_charts_built", count=len(charts))
+
+        return charts
+
+    @staticmethod
+    def build_trend_charts(
+        metric_name: str,
+        current_timeseries: Optional[pd.DataFrame],
+        baseline_timeseries: Optional[pd.DataFrame],
+        detection_result: DetectionResult,
+    ) -> List[ChartSpec]:
+        """
+        Build the charts that only need time-series and detection output.
+
+        They do not depend on deep insight, so they can be built while it runs.
 
-        # 1. Primary trend chart (only if time-series data is available)
+        Returns:
+            The primary trend chart, or an empty list without time-series data
+        """
+        # Primary trend chart (only if time-series data is available)
         has_timeseries = (
             current_timeseries is not None and 
             len(current_timeseries) > 0 and 
             any(col in current_timeseries.columns for col in ['date', 'Date', 'time', 'timestamp', 'period'])
         )
-        
-        if has_timeseries:
-            trend_chart = ChartBuilderService.build_primary_trend_chart(
-                metric_name=metric_name,
-                current_timeseries=current_timeseries,
-                baseline_timeseries=baseline_timeseries,
-                detection_result=detection_result,
-            )
-            charts.append(trend_chart)
+        if not has_timeseries:
+            return []
+
+        return [ChartBuilderService.build_primary_trend_chart(
+            metric_name=metric_name,
+            current_timeseries=current_timeseries,
+            baseline_timeseries=baseline_timeseries,
+            detection_result=detection_result,
+        )]
+
+    @staticmethod
+    def build_driver_charts(
+        metric_name: str,
+        baseline_timeseries: Optional[pd.DataFrame],
+        deep_insight: DeepInsight,
+    ) -> List[ChartSpec]:
+        """
+        Build the charts derived from deep insight drivers.
+
+        Returns:
+            Driver impact chart, plus the contribution comparison when a
+            baseline time-series exists
+        """
+        charts = []
 
-        # 2. Driver impact chart (MANDATORY)
+        # Driver impact chart (MANDATORY)
         if deep_insight.top_drivers:
             driver_chart = ChartBuilderService.build_driver_impact_chart(
                 top_drivers=deep_insight.top_drivers,
@@ -360,7 +404,7 @@ class ChartBuilderService:
             )
             charts.append(driver_chart)
 
-        # 3. Contribution comparison (OPTIONAL - if baseline exists)
+        # Contribution comparison (OPTIONAL - if baseline exists)
         if baseline_timeseries is not None and deep_insight.top_drivers:
             contrib_chart = ChartBuilderService.build_contribution_comparison_chart(
                 top_drivers=deep_insight.top_drivers,
@@ -368,6 +412,4 @@ class ChartBuilderService:
             )
             charts.append(contrib_chart)
 
-        logger.info("all_charts_built", count=len(charts))
-
         return charts
@@ -280,20 +280,30 @@ class ARIMADetectionEngine:
             residual_std = residuals.std()
             threshold = sensitivity * residual_std
 
+            # Align everything to the residual index once so the loop below
+            # reads plain arrays instead of doing a label lookup per point
+            aligned_idx = residuals.index
+            aligned_residuals = residuals.to_numpy()
+            aligned_ts = ts_data.reindex(aligned_idx).to_numpy()
+            aligned_fit = fitted_values.reindex(aligned_idx).to_numpy()
+
+            abs_residuals = np.abs(aligned_residuals)
+            anomaly_positions = np.flatnonzero(abs_residuals > threshold)
+
             anomalies = []
-            for idx, residual in residuals.items():
-                if abs(residual) > threshold:
-                    # Severity: 0-1 scale based on how many sigmas away
-                    severity = min(abs(residual) / (sensitivity * residual_std), 1.0)
-
-                    anomaly = AnomalyPoint(
-                        date=idx.date() if hasattr(idx, 'date') else idx,
-                        value=ts_data[idx],
-                        expected_value=fitted_values[idx],
-                        residual=residual,
-                        severity=severity,
-                    )
-                    anomalies.append(anomaly)
+            for pos in anomaly_positions:
+                idx = aligned_idx[pos]
+                # Severity: 0-1 scale based on how many sigmas away
+                severity = min(abs_residuals[pos] / threshold, 1.0)
+
+                anomaly = AnomalyPoint(
+                    date=idx.date() if hasattr(idx, 'date') else idx,
+                    value=aligned_ts[pos],
+                    expected_value=aligned_fit[pos],
+                    residual=aligned_residuals[pos],
+                    severity=severity,
+                )
+                anomalies.append(anomaly)
 
             # Sort by severity
             anomalies.sort(key=lambda x: x.severity, reverse=True)
@@ -0,0 +1,86 @@
+"""Shared async LLM clients - one connection pool per provider per process."""
+
+from typing import Any, Dict, Type
+import httpx
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Created on first use so importing services does not require API keys
+_clients: Dict[str, Any] = {}
+
+
+def get_async_client(provider: str) -> Any:
+    """
+    Get the process-wide async client for an LLM provider.
+
+    All generators share it, so HTTP connections and TLS sessions are reused
+    across requests instead of each instance opening its own pool.
+
+    Args:
+        provider: "openai" or "anthropic"
+
+    Returns:
+        AsyncOpenAI or AsyncAnthropic client
+    """
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+    )
+
+    if provider == "openai":
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+    else:
+        from anthropic import AsyncAnthropic
+        client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            http_client=http_client,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+
+    _clients[provider] = client
+    logger.info("llm_client_created", provider=provider)
+    return client
+
+
+async def close_async_clients() -> None:
+    """Close the shared clients and their connection pools (app shutdown)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+    if clients:
+        logger.info("llm_clients_closed", count=len(clients))
+
+
+def get_api_error(provider: str) -> Type[Exception]:
+    """
+    Get the base exception class of a provider SDK.
+
+    Covers timeouts, connection errors and error statuses (after the SDK's
+    own retries), so callers can degrade gracefully on any failed call.
+
+    Args:
+        provider: "openai" or "anthropic"
+
+    Returns:
+        openai.APIError or anthropic.APIError
+    """
+    if provider == "openai":
+        from openai import APIError
+    else:
+        from anthropic import APIError
+    return APIError
@@ -0,0 +1,86 @@
+"""Persistent LLM response cache - survives restarts and is shared across workers."""
+
+import sqlite3
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    ts REAL NOT NULL
+)
+"""
+
+
+class LLMResponseStore:
+    """
+    SQLite-backed key/value store for validated LLM responses.
+
+    Sits behind the in-process LRU of LLMSQLGenerator: a miss there is
+    looked up here before calling the LLM. Entries older than
+    settings.LLM_RESPONSE_CACHE_TTL are ignored and pruned on write.
+
+    Methods are blocking; call them from a worker thread.
+    """
+
+    def __init__(self, database_url: str):
+        """
+        Initialize the store.
+
+        Args:
+            database_url: SQLite database URL (sqlite:///path/to/db.db)
+        """
+        if not database_url.startswith("sqlite:///"):
+            raise ValueError(f"Unsupported database URL format: {database_url}")
+        self.db_path = database_url.replace("sqlite:///", "")
+
+        with self._connect() as conn:
+            conn.execute(_CREATE_TABLE_SQL)
+
+        logger.info("llm_response_store_initialized", db_path=self.db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=settings.QUERY_TIMEOUT, check_same_thread=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored response for key, or None if missing or expired."""
+        cutoff = time.time() - settings.LLM_RESPONSE_CACHE_TTL
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT response FROM llm_response_cache WHERE key = ? AND ts >= ?",
+                    (key, cutoff),
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # The cache is an optimization; never fail the request over it
+            logger.warning("llm_response_store_read_failed", error=str(e))
+            return None
+        return row[0] if row else None
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response and prune expired entries."""
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_response_cache (key, response, ts) VALUES (?, ?, ?)",
+                        (key, response, now),
+                    )
+                    conn.execute(
+                        "DELETE FROM llm_response_cache WHERE ts < ?",
+                        (now - settings.LLM_RESPONSE_CACHE_TTL,),
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("llm_response_store_write_failed", error=str(e))
@@ -1,56 +1,259 @@
 """LLM SQL Generator - Generate SQL queries directly from natural language using LLM."""
 
+import asyncio
+import hashlib
 import json
-from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
-from app.models.plan import TQLPlan, PlanMetadata
-from app.models.intent import ParsedIntent, TimeRange, BaselineConfig, FeedType, BaselineType, ThresholdConfig, ComparisonOperator
+import re
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, ValidationError, field_validator
+from app.models.plan import TQLPlan
+from app.models.intent import ParsedIntent, BaselineConfig, FeedType, BaselineType, ComparisonOperator
 from app.services.bv_context_builder import BVContext
+from app.services.tql_planner import TQLPlanner
+from app.services.llm_clients import get_async_client
+from app.services.llm_response_store import LLMResponseStore
+from app.services.question_parser import FastPathParser
 from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# System prompts kept per generator: up to four guide selections per BV
+_SYSTEM_PROMPT_CACHE_SIZE = 64
+
+# JSON object inside a ``` / ```json markdown fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Prompt sections that teach the LLM the feed_type / threshold mapping. They
+# are left out of the system prompt when _classify_intent already resolved the
+# answer locally.
+_THRESHOLD_GUIDE = """## Threshold Configuration Guide
+The threshold_config determines when to trigger an alert:
+
+### Operators:
+- "greater_than": current > value (e.g., revenue > $1M)
+- "less_than": current < value (e.g., profit < $100K)
+- "greater_than_equal": current >= value
+- "less_than_equal": current <= value
+- "equal": current == value
+- "not_equal": current != value
+- "change_greater_than": |current - baseline| > value (e.g., change > $50K)
+- "change_less_than": |current - baseline| < value
+
+### compare_to:
+- "current": Compare current period value against threshold
+- "baseline": Compare baseline period value against threshold
+- "change": Compare absolute change (current - baseline) against threshold
+- "percent_change": Compare percentage change against threshold
+
+### Examples:
+- User asks "Alert if revenue drops below $1M" → operator: "less_than", value: 1000000, compare_to: "current"
+- User asks "Alert if profit exceeds $500K" → operator: "greater_than", value: 500000, compare_to: "current"
+- User asks "Alert if change is more than $100K" → operator: "change_greater_than", value: 100000, compare_to: "change"
+- User asks "Why did revenue drop?" (no specific threshold) → operator: "change_greater_than", value: 0, compare_to: "change" (any change triggers)
+
+"""
+
+_FEED_TYPE_GUIDE = """## Choosing feed_type (CRITICAL - Understand User Intent)
+
+Choose feed_type based on the SEMANTIC INTENT of the question, NOT just keywords:
+
+### Use "absolute" when the user's intent is to:
+- **Compare two specific time periods** (e.g., "Q3 vs Q2", "this month vs last month", "2024 vs 2023")
+- **Understand WHY a change happened** between two periods (e.g., "Why did revenue drop?", "What caused the increase?")
+- **Quantify a difference** between current and baseline (e.g., "How much did profit change?")
+- **Explain root causes** of a known change (e.g., "What drove the growth in Enterprise segment?")
+- The user implies or explicitly mentions a comparison baseline period
+
+### Use "arima" when the user's intent is to:
+- **Detect unusual patterns or outliers** in the data over time (e.g., "Find anomalies in sales")
+- **Identify unexpected behavior** without a specific comparison period (e.g., "Is there anything unusual?")
+- **Monitor for deviations from expected trends** (e.g., "Alert me if revenue behaves abnormally")
+- **Analyze time-series patterns** for statistical outliers (e.g., "Detect spikes in the last 6 months")
+- The user wants to find anomalies within a SINGLE time range (not comparing two periods)
+
+### Decision Framework:
+1. Does the user mention or imply TWO time periods to compare? → "absolute"
+2. Is the user asking WHY something changed between periods? → "absolute" 
+3. Is the user looking for outliers/anomalies within a single time range? → "arima"
+4. Is the user asking for pattern/trend monitoring without baseline? → "arima"
+5. Default: If comparing periods or asking "why" → "absolute"; If detecting anomalies → "arima"
+
+### Examples:
+- "Why did revenue drop in Q3 2024?" → "absolute" (asking WHY, implies comparison to previous period)
+- "Show me anomalies in revenue for 2024" → "arima" (detecting outliers in a time series)
+- "Compare Q4 sales to Q3" → "absolute" (explicit two-period comparison)
+- "Is there anything unusual about November sales?" → "arima" (looking for unexpected patterns)
+- "What caused the profit spike in October?" → "absolute" (asking WHY a known change happened)
+- "Detect any irregular patterns in customer count" → "arima" (pattern detection)
+- "Revenue dropped 20% - what happened?" → "absolute" (explaining a known change)
+
+"""
+
+# Keyword groups for local intent classification
+_ABSOLUTE_INTENT_RE = re.compile(
+    r"\b(why|compare[sd]?|comparison|vs\.?|versus|drop(?:ped|s)?|decrease[sd]?|decline[sd]?|"
+    r"fell|fall|plunge[sd]?|increase[sd]?|grew|growth|caused?|drove|driven|change[sd]?)\b",
+    re.IGNORECASE,
+)
+_ARIMA_INTENT_RE = re.compile(
+    r"\b(anomal(?:y|ies|ous)|unusual|outliers?|irregular|abnormal(?:ly)?|"
+    r"spikes?|deviations?|unexpected)\b",
+    re.IGNORECASE,
+)
+# "below $1M", "exceeds 500K", "more than 10%"; a bare number must have at least
+# five digits so years ("over 2024") are not taken as thresholds
+_THRESHOLD_RE = re.compile(
+    r"\b(below|under|less than|above|over|exceeds?|more than|greater than)\s+"
+    r"(?:(\$)\s*)?(\d[\d,]*(?:\.\d+)?)\s*(k|m|b|%)?(?!\w)",
+    re.IGNORECASE,
+)
+_CHANGE_RE = re.compile(r"\bchange\b", re.IGNORECASE)
+_LESS_THAN_WORDS = {"below", "under", "less than"}
+_MAGNITUDE_SUFFIXES = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+# (timestamp, ISO date) of the last date lookup, see _today_iso
+_today_cache: Tuple[float, str] = (0.0, "")
+
+
+def _today_iso() -> str:
+    """Today's date as YYYY-MM-DD, re-read at most once a minute."""
+    global _today_cache
+    now = time.time()
+    if now - _today_cache[0] > 60:
+        _today_cache = (now, date.today().isoformat())
+    return _today_cache[1]
+
+
+# Alert configuration used when the LLM response does not include one
+_DEFAULT_ALERT_CONFIG: Dict[str, Any] = {
+    "should_trigger_alert": False,
+    "alert_type": "unknown",
+    "severity": "low",
+    "threshold_percent": 5.0,
+    "description": "No alert configured",
+}
+
 
 class LLMSQLGeneratorResponse:
     """Response from LLM SQL Generator containing both SQL and parsed intent."""
 
+    __slots__ = ("tql_plan", "parsed_intent", "raw_llm_response", "alert_config")
+
     def __init__(
         self,
         tql_plan: TQLPlan,
         parsed_intent: ParsedIntent,
         raw_llm_response: Dict[str, Any],
+        alert_config: Optional[Dict[str, Any]] = None,
     ):
         self.tql_plan = tql_plan
         self.parsed_intent = parsed_intent
         self.raw_llm_response = raw_llm_response
+        self.alert_config = alert_config if alert_config is not None else _DEFAULT_ALERT_CONFIG
+
+
+class LLMIntentPayload(BaseModel):
+    """Schema of the JSON object the LLM is asked to return."""
+    intent: ParsedIntent
+    breakdown_dimension: Optional[str] = None
+    alert_config: Optional[Dict[str, Any]] = None
+
+    @field_validator("intent", mode="before")
+    @classmethod
+    def _default_unknown_enums(cls, intent: Any) -> Any:
+        """
+        Fall back to defaults for enum values the LLM made up instead of
+        rejecting the whole response: feed_type -> absolute, baseline type
+        -> previous_period, and an unknown threshold operator drops the
+        threshold_config.
+        """
+        if not isinstance(intent, dict):
+            return intent
+
+        feed_type = intent.get("feed_type")
+        if feed_type is not None and feed_type not in FeedType._value2member_map_:
+            logger.warning("unknown_feed_type", value=feed_type)
+            intent["feed_type"] = FeedType.ABSOLUTE.value
+
+        baseline = intent.get("baseline")
+        if isinstance(baseline, dict) and baseline.get("type") not in BaselineType._value2member_map_:
+            logger.warning("unknown_baseline_type", value=baseline.get("type"))
+            baseline["type"] = BaselineType.PREVIOUS_PERIOD.value
+
+        threshold_config = intent.get("threshold_config")
+        if (
+            isinstance(threshold_config, dict)
+            and threshold_config.get("operator", ComparisonOperator.GREATER_THAN.value)
+            not in ComparisonOperator._value2member_map_
+        ):
+            logger.warning("failed_to_parse_threshold_config", operator=threshold_config.get("operator"))
+            intent["threshold_config"] = None
+
+        return intent
 
 
 class LLMSQLGenerator:
     """
     Generates SQL queries directly from natural language using LLM.
     
-    This replaces the two-step process (QuestionParser -> TQLPlanner)
-    with a single LLM call that generates both the structured intent
-    and the SQL queries.
+    This replaces the QuestionParser step with a single LLM call that
+    extracts the structured intent; the SQL queries are then planned from
+    it by TQLPlanner.
     
     Supports both OpenAI and Anthropic providers.
     """
 
-    def __init__(self):
+    def __init__(self, response_store: Optional[LLMResponseStore] = None):
+        """
+        Initialize the generator.
+
+        Args:
+            response_store: Optional persistent tier behind the in-process
+                response cache (shared across processes and restarts)
+        """
         self.provider = settings.LLM_PROVIDER.lower()
         
+        # Shared async client so the LLM round-trip does not block the event
+        # loop and connections are pooled across generators
+        self.client = get_async_client(self.provider)
+
         if self.provider == "openai":
-            from openai import OpenAI
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
             self.model = settings.OPENAI_MODEL
             logger.info("llm_provider_initialized", provider="openai", model=self.model)
         else:
-            from anthropic import Anthropic
-            self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
             self.model = settings.ANTHROPIC_MODEL
             logger.info("llm_provider_initialized", provider="anthropic", model=self.model)
 
+        betas = [b.strip() for b in (settings.ANTHROPIC_BETA_FEATURES or "").split(",") if b.strip()]
+        if settings.ANTHROPIC_PROMPT_CACHE_TTL == "1h":
+            betas.append("extended-cache-ttl-2025-04-11")
+        self._extra_headers = (
+            {"anthropic-beta": ",".join(betas)}
+            if self.provider != "openai" and betas
+            else None
+        )
+
+        # Last time the provider-side prompt cache was written or read, the
+        # keepalive refreshes sent since the last real request, and the task
+        # that refreshes the cache when traffic is idle
+        self._last_cache_refresh = 0.0
+        self._idle_refreshes = 0
+        self._keepalive_enabled = False
+        self._keepalive_task: Optional[asyncio.Task] = None
+
+        # LRU of static system prompts keyed by (BV version, guide selection)
+        self._system_prompt_cache: "OrderedDict[Tuple[str, bool, bool], str]" = OrderedDict()
+
+        # LRU of full responses keyed by (normalized question, BV version, date)
+        self._response_cache: "OrderedDict[str, LLMSQLGeneratorResponse]" = OrderedDict()
+        self._response_store = response_store
+
     async def generate(
         self, user_question: str, bv_context: BVContext
     ) -> LLMSQLGeneratorResponse:
@@ -66,35 +269,136 @@ class LLMSQLGenerator:
         """
         logger.info("llm_sql_generation_started", question=user_question, provider=self.provider)
 
-        # Build prompt for LLM
-        prompt = self._build_prompt(user_question, bv_context)
+        # Rigid templates are answered locally, without an LLM round-trip
+        fast_response = self._fast_path_response(user_question, bv_context)
+        if fast_response is not None:
+            return fast_response
+
+        cache_key = self._response_cache_key(user_question, bv_context)
+        cached = await self._cached_response(cache_key, bv_context)
+        if cached is not None:
+            logger.info("llm_sql_generation_cache_hit", question=user_question)
+            return cached
+
+        # Build prompt for LLM: the BV-derived instructions are stable across
+        # questions and go in the system block so the provider can cache them
+        system_prompt, user_prompt = self._build_prompts(user_question, bv_context)
+
+        # Stream the completion; the full text is still needed for the plan
+        chunks = []
+        async for chunk in self._stream_completion(system_prompt, user_prompt):
+            chunks.append(chunk)
+        response_text = "".join(chunks)
+
+        response = self._build_response(response_text, bv_context)
+        await self._store_response(cache_key, response)
+        return response
+
+    async def generate_many(
+        self, user_questions: List[str], bv_context: BVContext
+    ) -> List[LLMSQLGeneratorResponse]:
+        """
+        Generate responses for many questions in one provider batch.
+
+        With Anthropic, uncached questions are submitted together through the
+        Message Batches API (sharing the cached system prompt) and the batch is
+        polled until it ends. Entries that did not succeed are retried with
+        generate(). Other providers fall back to concurrent generate() calls.
+
+        Args:
+            user_questions: Natural language questions
+            bv_context: Business View context for grounding
 
-        # Call LLM based on provider
+        Returns:
+            Responses in the same order as user_questions
+        """
         if self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=settings.OPENAI_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}],
+            return list(await asyncio.gather(
+                *(self.generate(question, bv_context) for question in user_questions)
+            ))
+
+        logger.info("llm_sql_batch_started", questions_count=len(user_questions))
+
+        cache_keys = [self._response_cache_key(q, bv_context) for q in user_questions]
+        responses: List[Optional[LLMSQLGeneratorResponse]] = [
+            self._fast_path_response(question, bv_context) or await self._cached_response(key, bv_context)
+            for question, key in zip(user_questions, cache_keys)
+        ]
+
+        batch_requests = []
+        for index, question in enumerate(user_questions):
+            if responses[index] is not None:
+                continue
+            system_prompt, user_prompt = self._build_prompts(question, bv_context)
+            batch_requests.append({
+                "custom_id": f"question-{index}",
+                "params": {
+                    "model": self.model,
+                    "max_tokens": settings.LLM_SQL_MAX_TOKENS,
+                    "temperature": settings.ANTHROPIC_TEMPERATURE,
+                    "system": self._system_blocks(system_prompt),
+                    "messages": [{"role": "user", "content": user_prompt}],
+                },
+            })
+
+        if batch_requests:
+            batch = await self.client.messages.batches.create(
+                requests=batch_requests, extra_headers=self._extra_headers
             )
-            response_text = response.choices[0].message.content
-        else:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=settings.ANTHROPIC_MAX_TOKENS,
-                temperature=settings.ANTHROPIC_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            response_text = response.content[0].text
+            self._mark_cache_used()
+            while batch.processing_status != "ended":
+                await asyncio.sleep(settings.LLM_BATCH_POLL_INTERVAL)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+
+            # Results are not guaranteed to come back in request order
+            async for entry in await self.client.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    logger.warning("llm_sql_batch_entry_failed", custom_id=entry.custom_id, result=entry.result.type)
+                    continue
+                index = int(entry.custom_id.rsplit("-", 1)[1])
+                try:
+                    response = self._build_response(entry.result.message.content[0].text, bv_context)
+                except ValueError as e:
+                    logger.warning("llm_sql_batch_entry_unparseable", custom_id=entry.custom_id, error=str(e))
+                    continue
+                await self._store_response(cache_keys[index], response)
+                responses[index] = response
+
+        for index, question in enumerate(user_questions):
+            if responses[index] is None:
+                responses[index] = await self.generate(question, bv_context)
+
+        logger.info("llm_sql_batch_completed", questions_count=len(user_questions))
+        return responses
+
+    def _fast_path_response(
+        self, user_question: str, bv_context: BVContext
+    ) -> Optional[LLMSQLGeneratorResponse]:
+        """
+        Answer a rigid question template locally (see FastPathParser), else None.
 
+        Relative windows are left to the LLM: the system prompt pins "recent"
+        periods to the database's data range rather than today's date. The
+        baseline is the last_year default the prompt asks the LLM for.
+        """
+        intent_json = FastPathParser.try_parse(
+            user_question, bv_context, date.fromisoformat(_today_iso()), relative_windows=False
+        )
+        if intent_json is None:
+            logger.debug("fast_path_miss", question=user_question)
+            return None
+        logger.info("fast_path_hit", question=user_question)
+        intent_json["baseline"] = {"type": BaselineType.LAST_YEAR.value}
+        return self._build_response(json.dumps({"intent": intent_json}), bv_context)
+
+    def _build_response(self, response_text: str, bv_context: BVContext) -> LLMSQLGeneratorResponse:
+        """Parse raw LLM output into an LLMSQLGeneratorResponse."""
         logger.debug("llm_sql_response", response=response_text[:500])
 
-        # Parse JSON
-        parsed_json = self._extract_json(response_text)
-        
-        # Convert to TQL Plan and ParsedIntent
-        tql_plan = self._json_to_tql_plan(parsed_json)
-        parsed_intent = self._json_to_parsed_intent(parsed_json)
+        # Parse and validate the JSON in one pass
+        payload = self._decode_response(response_text)
+        parsed_intent = self._resolve_intent(payload.intent, bv_context)
+        tql_plan = self._build_tql_plan(parsed_intent, bv_context, payload.breakdown_dimension)
 
         logger.info(
             "llm_sql_generation_completed",
@@ -105,39 +409,228 @@ class LLMSQLGenerator:
         return LLMSQLGeneratorResponse(
             tql_plan=tql_plan,
             parsed_intent=parsed_intent,
-            raw_llm_response=parsed_json,
+            raw_llm_response=payload.model_dump(mode="json", exclude_none=True),
+            alert_config=payload.alert_config,
         )
 
-    def _extract_json(self, response_text: str) -> Dict[str, Any]:
-        """Extract JSON from LLM response."""
+    async def _cached_response(
+        self, cache_key: str, bv_context: BVContext
+    ) -> Optional[LLMSQLGeneratorResponse]:
+        """Look a response up in the LRU, then in the persistent store."""
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            return cached
+
+        if self._response_store is None:
+            return None
+        stored = await asyncio.to_thread(self._response_store.get, cache_key)
+        if stored is None:
+            return None
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError:
-            # Try to extract JSON from markdown code blocks
-            if "```json" in response_text:
-                json_str = response_text.split("```json")[1].split("```")[0].strip()
-                return json.loads(json_str)
-            elif "```" in response_text:
-                json_str = response_text.split("```")[1].split("```")[0].strip()
-                return json.loads(json_str)
-            else:
-                raise ValueError(f"Failed to parse LLM response as JSON: {response_text[:500]}")
-
-    def _build_prompt(self, question: str, bv_context: BVContext) -> str:
-        """Build LLM prompt for SQL generation."""
-
-        measures_list = "\n".join(
-            [f"  - {name}: {info['expression']}" for name, info in bv_context.measures_info.items()]
-        )
+            # Re-validated and re-materialized; no LLM call
+            response = self._build_response(stored, bv_context)
+        except ValueError as e:
+            logger.warning("llm_sql_stored_response_unusable", error=str(e))
+            return None
+        self._cache_response(cache_key, response)
+        return response
+
+    async def _store_response(self, cache_key: str, response: LLMSQLGeneratorResponse) -> None:
+        """Cache a response in the LRU and, if configured, the persistent store."""
+        self._cache_response(cache_key, response)
+        if self._response_store is not None:
+            await asyncio.to_thread(
+                self._response_store.put, cache_key, json.dumps(response.raw_llm_response)
+            )
+
+    def _cache_response(self, cache_key: str, response: LLMSQLGeneratorResponse) -> None:
+        """Store a response in the LRU, evicting the oldest entry if full."""
+        self._response_cache[cache_key] = response
+        if len(self._response_cache) > settings.LLM_RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    @staticmethod
+    def _response_cache_key(user_question: str, bv_context: BVContext) -> str:
+        """
+        Build the response cache key.
+
+        The question is whitespace-collapsed but keeps its case, since
+        filter values ("US" vs "us") are case-sensitive in the data. The BV
+        version keeps answers from one Business View from being served for
+        another, and the current date is included because relative periods
+        ("last month") resolve against it.
+        """
+        normalized = _WHITESPACE_RE.sub(" ", user_question).strip().rstrip("?.! ")
+        raw_key = f"{normalized}|{bv_context.version_hash()}|{_today_iso()}"
+        return hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
 
-        dimensions_list = "\n".join(
-            [f"  - {name}: {info['table']}.{info['column']}" for name, info in bv_context.dimensions_info.items()]
+    async def _stream_completion(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """Stream response text deltas from the configured provider."""
+        if self.provider == "openai":
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                max_tokens=settings.LLM_SQL_MAX_TOKENS,
+                temperature=settings.OPENAI_TEMPERATURE,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                stream=True,
+            )
+            async for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+        else:
+            async with self.client.messages.stream(
+                model=self.model,
+                max_tokens=settings.LLM_SQL_MAX_TOKENS,
+                temperature=settings.ANTHROPIC_TEMPERATURE,
+                extra_headers=self._extra_headers,
+                system=self._system_blocks(system_prompt),
+                messages=[{"role": "user", "content": user_prompt}],
+            ) as stream:
+                self._mark_cache_used()
+                async for text in stream.text_stream:
+                    yield text
+
+    @staticmethod
+    def _system_blocks(system_prompt: str) -> List[Dict[str, Any]]:
+        """Anthropic system blocks with the prompt marked as cacheable."""
+        cache_control: Dict[str, str] = {"type": "ephemeral"}
+        if settings.ANTHROPIC_PROMPT_CACHE_TTL == "1h":
+            cache_control["ttl"] = "1h"
+        return [{"type": "text", "text": system_prompt, "cache_control": cache_control}]
+
+    def start_cache_keepalive(self) -> None:
+        """
+        Keep the provider prompt cache warm between requests.
+
+        Only applies to Anthropic; must be called from a running event loop.
+        The background task runs while there is traffic (see
+        _keep_prompt_cache_warm) and is restarted by the next request.
+        """
+        if self.provider == "openai" or settings.ANTHROPIC_CACHE_KEEPALIVE_INTERVAL <= 0:
+            return
+        self._keepalive_enabled = True
+        if self._last_cache_refresh > 0:
+            self._ensure_keepalive_task()
+
+    def close(self) -> None:
+        """Stop the prompt cache keepalive task."""
+        self._keepalive_enabled = False
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+
+    def _mark_cache_used(self) -> None:
+        """Record a real request on the prompt cache; resumes a stopped keepalive."""
+        self._last_cache_refresh = time.monotonic()
+        self._idle_refreshes = 0
+        if self._keepalive_enabled:
+            self._ensure_keepalive_task()
+
+    def _ensure_keepalive_task(self) -> None:
+        """Start the keepalive task unless it is already running."""
+        if self._keepalive_task is None:
+            self._keepalive_task = asyncio.get_running_loop().create_task(self._keep_prompt_cache_warm())
+
+    async def _keep_prompt_cache_warm(self) -> None:
+        """
+        Re-send the built system prompts whenever no request has touched the
+        cache for ANTHROPIC_CACHE_KEEPALIVE_INTERVAL seconds.
+
+        Each refresh is a 1-token request, far cheaper than a cold prefill of
+        the full system prompt. After ANTHROPIC_CACHE_KEEPALIVE_MAX_IDLE_REFRESHES
+        refreshes without a real request in between the task ends, so an idle
+        process stops paying for pings.
+        """
+        interval = settings.ANTHROPIC_CACHE_KEEPALIVE_INTERVAL
+        while self._idle_refreshes < settings.ANTHROPIC_CACHE_KEEPALIVE_MAX_IDLE_REFRESHES:
+            idle = time.monotonic() - self._last_cache_refresh
+            if idle < interval:
+                await asyncio.sleep(interval - idle)
+                continue
+
+            for system_prompt in list(self._system_prompt_cache.values()):
+                try:
+                    await self.client.messages.create(
+                        model=self.model,
+                        max_tokens=1,
+                        extra_headers=self._extra_headers,
+                        system=self._system_blocks(system_prompt),
+                        messages=[{"role": "user", "content": "ping"}],
+                    )
+                except Exception as e:
+                    logger.warning("prompt_cache_keepalive_failed", error=str(e))
+            self._last_cache_refresh = time.monotonic()
+            self._idle_refreshes += 1
+            logger.debug("prompt_cache_refreshed", prompts=len(self._system_prompt_cache))
+
+        self._keepalive_task = None
+        logger.info("prompt_cache_keepalive_stopped", idle_refreshes=self._idle_refreshes)
+
+    @staticmethod
+    def _decode_response(response_text: str) -> "LLMIntentPayload":
+        """Decode and validate the LLM JSON, unwrapping a markdown fence if needed."""
+        try:
+            return LLMIntentPayload.model_validate_json(response_text)
+        except ValidationError as e:
+            error = e
+        # Try to extract JSON from markdown code blocks
+        match = _FENCE_RE.search(response_text)
+        if match:
+            try:
+                return LLMIntentPayload.model_validate_json(match.group(1))
+            except ValidationError as e:
+                error = e
+        raise ValueError(f"Invalid LLM response ({error.error_count()} errors): {response_text[:500]}") from error
+
+    def _build_prompts(self, question: str, bv_context: BVContext) -> Tuple[str, str]:
+        """
+        Build the (system, user) prompt pair for a question.
+
+        Feed type and threshold are classified locally first; when that is
+        conclusive the corresponding guide is dropped from the system prompt
+        and the answer is passed to the LLM as a hint instead.
+        """
+        hints = self._classify_intent(question)
+        system_prompt = self._build_system_prompt(
+            bv_context,
+            include_feed_type_guide="feed_type" not in hints,
+            include_threshold_guide="threshold_config" not in hints,
         )
+        return system_prompt, self._build_user_prompt(question, hints)
+
+    def _build_system_prompt(
+        self,
+        bv_context: BVContext,
+        include_feed_type_guide: bool = True,
+        include_threshold_guide: bool = True,
+    ) -> str:
+        """
+        Build the static part of the SQL generation prompt.
+
+        Everything here is derived from the Business View and does not depend
+        on the question or the current date, so the result is memoized per
+        BV version (and guide selection) and sent as a cacheable system block.
+        """
+        cache_key = (bv_context.version_hash(), include_feed_type_guide, include_threshold_guide)
+        cached = self._system_prompt_cache.get(cache_key)
+        if cached is not None:
+            self._system_prompt_cache.move_to_end(cache_key)
+            return cached
+
+        measures_list = bv_context.formatted_measures
+        dimensions_list = bv_context.formatted_dimensions
 
         # Build table schema
         schema_description = bv_context.schema_context
 
-        prompt = f"""You are an expert SQL generator for Tellius Intelligent Feed analytics system.
+        threshold_guide = _THRESHOLD_GUIDE if include_threshold_guide else ""
+        feed_type_guide = _FEED_TYPE_GUIDE if include_feed_type_guide else ""
+
+        prompt = f"""You are an expert analytics intent parser for Tellius Intelligent Feed analytics system.
 
 ## Database Schema
 {schema_description}
@@ -152,46 +645,15 @@ class LLMSQLGenerator:
 - Column: {bv_context.time_info['full_name']}
 - Table: {bv_context.time_info['table']}
 
-## Join Relationships
-The tables are joined as follows:
-- sales_fact.date_id = date_dim.date_id
-- sales_fact.product_id = product_dim.product_id
-- sales_fact.customer_id = customer_dim.customer_id
-- sales_fact.region_id = region_dim.region_id
-
-## Current Date
-{datetime.now().date().isoformat()}
-
 ## IMPORTANT: Database Data Range
 The database contains historical data from **2023-01-01 to 2024-12-31** only.
 - If the user's question does not specify a date range, use 2024 as the default year (e.g., "2024-01-01" to "2024-12-31").
 - If the user asks about "current" or "recent" data, use the last available date range: 2024-10-01 to 2024-12-31.
 - NEVER generate dates beyond 2024-12-31 as there is no data for those dates.
 
-## User Question
-"{question}"
-
 ## Your Task
-Generate SQL queries to answer this question. You MUST generate:
-
-1. **current_period_query**: SQL to get the metric value for the analyzed time period
-2. **baseline_period_query**: SQL to get the metric value for the comparison period (if comparison is requested)
-3. **timeseries_query**: SQL to get time-series data for trend/anomaly detection (if analyzing patterns over time)
-4. **dimensional_breakdown_query**: SQL to break down the metric by dimensions for root-cause analysis
-5. **baseline_dimensional_breakdown_query**: SQL for baseline period breakdown (if comparison is requested)
-
-## SQL Generation Rules
-1. Use the exact measure expressions provided above
-2. Always include proper JOINs between tables
-3. Use the date_dim.date column for time filtering with format 'YYYY-MM-DD'
-4. For aggregated metrics, alias the result as 'metric_value'
-5. For time-series, alias date as 'date' and metric as 'value'
-6. **CRITICAL for dimensional breakdowns**: 
-   - Break down by ONLY ONE dimension at a time (e.g., just region OR just category, NOT both)
-   - Choose the most relevant dimension for the question (e.g., region for geographic questions, category for product questions)
-   - If no specific dimension is mentioned, use 'region' as the default
-   - Format: SELECT dimension_column AS dimension_name, SUM(metric) AS metric_value FROM ... GROUP BY dimension_column
-   - Example: SELECT region_dim.region_name AS region, SUM(sales_fact.revenue) AS metric_value FROM ... GROUP BY region_dim.region_name
+Extract the structured analysis intent from the user's question. Do NOT write SQL;
+the queries are generated from this intent.
 
 ## Response Format
 Return ONLY valid JSON:
@@ -207,8 +669,8 @@ Return ONLY valid JSON:
     "filters": {{"DimensionName": "value"}},
     "baseline": {{
       "type": "previous_period|last_year|custom",
-      "start_date": "YYYY-MM-DD",
-      "end_date": "YYYY-MM-DD"
+      "start_date": "YYYY-MM-DD or null (custom only)",
+      "end_date": "YYYY-MM-DD or null (custom only)"
     }},
     "feed_type": "absolute|arima",
     "threshold_config": {{
@@ -217,13 +679,7 @@ Return ONLY valid JSON:
       "compare_to": "current|baseline|change|percent_change"
     }}
   }},
-  "sql": {{
-    "current_period_query": "SELECT ... AS metric_value FROM ... WHERE ...",
-    "baseline_period_query": "SELECT ... AS metric_value FROM ... WHERE ... (ALWAYS REQUIRED - use previous year if not specified)",
-    "timeseries_query": "SELECT date, value FROM ... GROUP BY date ORDER BY date" or null,
-    "dimensional_breakdown_query": "SELECT dimension, metric_value FROM ... GROUP BY dimension (ALWAYS REQUIRED)",
-    "baseline_dimensional_breakdown_query": "SELECT dimension, metric_value FROM ... GROUP BY dimension (ALWAYS REQUIRED)"
-  }},
+  "breakdown_dimension": "exact_dimension_name",
   "alert_config": {{
     "should_trigger_alert": true,
     "alert_type": "drop|increase|anomaly|spike",
@@ -233,187 +689,159 @@ Return ONLY valid JSON:
 }}
 ```
 
-## Threshold Configuration Guide
-The threshold_config determines when to trigger an alert:
-
-### Operators:
-- "greater_than": current > value (e.g., revenue > $1M)
-- "less_than": current < value (e.g., profit < $100K)
-- "greater_than_equal": current >= value
-- "less_than_equal": current <= value
-- "equal": current == value
-- "not_equal": current != value
-- "change_greater_than": |current - baseline| > value (e.g., change > $50K)
-- "change_less_than": |current - baseline| < value
-
-### compare_to:
-- "current": Compare current period value against threshold
-- "baseline": Compare baseline period value against threshold
-- "change": Compare absolute change (current - baseline) against threshold
-- "percent_change": Compare percentage change against threshold
-
-### Examples:
-- User asks "Alert if revenue drops below $1M" → operator: "less_than", value: 1000000, compare_to: "current"
-- User asks "Alert if profit exceeds $500K" → operator: "greater_than", value: 500000, compare_to: "current"
-- User asks "Alert if change is more than $100K" → operator: "change_greater_than", value: 100000, compare_to: "change"
-- User asks "Why did revenue drop?" (no specific threshold) → operator: "change_greater_than", value: 0, compare_to: "change" (any change triggers)
-
-## Important Notes - MANDATORY REQUIREMENTS
-- Generate complete, executable SQL queries
-- Include all necessary JOINs
-- Use proper date filtering based on the time range
-
-### CRITICAL: Always Generate These Queries (NEVER leave them null):
-1. **baseline_period_query** - ALWAYS required for driver analysis:
-   - If user specifies a comparison period, use that
-   - Otherwise, use the PREVIOUS YEAR as default baseline (e.g., if current is 2024, baseline is 2023)
-   - For monthly data, compare to same month previous year
-   - This enables meaningful change analysis and driver insights
-   
-2. **dimensional_breakdown_query** - ALWAYS required for root-cause:
-   - Break down by the most relevant dimension (usually region, category, or product)
-   - Shows which dimension members contribute most to the current value
-   
-3. **baseline_dimensional_breakdown_query** - ALWAYS required when baseline exists:
-   - Same structure as dimensional_breakdown_query but for baseline period
-   - Enables comparison of which drivers changed
-
-- For timeseries_query, GROUP BY date_dim.date and ORDER BY date_dim.date
-- For dimensional queries, GROUP BY only ONE dimension at a time
-
-## Choosing feed_type (CRITICAL - Understand User Intent)
-
-Choose feed_type based on the SEMANTIC INTENT of the question, NOT just keywords:
-
-### Use "absolute" when the user's intent is to:
-- **Compare two specific time periods** (e.g., "Q3 vs Q2", "this month vs last month", "2024 vs 2023")
-- **Understand WHY a change happened** between two periods (e.g., "Why did revenue drop?", "What caused the increase?")
-- **Quantify a difference** between current and baseline (e.g., "How much did profit change?")
-- **Explain root causes** of a known change (e.g., "What drove the growth in Enterprise segment?")
-- The user implies or explicitly mentions a comparison baseline period
-
-### Use "arima" when the user's intent is to:
-- **Detect unusual patterns or outliers** in the data over time (e.g., "Find anomalies in sales")
-- **Identify unexpected behavior** without a specific comparison period (e.g., "Is there anything unusual?")
-- **Monitor for deviations from expected trends** (e.g., "Alert me if revenue behaves abnormally")
-- **Analyze time-series patterns** for statistical outliers (e.g., "Detect spikes in the last 6 months")
-- The user wants to find anomalies within a SINGLE time range (not comparing two periods)
-
-### Decision Framework:
-1. Does the user mention or imply TWO time periods to compare? → "absolute"
-2. Is the user asking WHY something changed between periods? → "absolute" 
-3. Is the user looking for outliers/anomalies within a single time range? → "arima"
-4. Is the user asking for pattern/trend monitoring without baseline? → "arima"
-5. Default: If comparing periods or asking "why" → "absolute"; If detecting anomalies → "arima"
+{threshold_guide}## Important Notes - MANDATORY REQUIREMENTS
+- Use exact measure and dimension names from the lists above
+- ALWAYS provide a baseline: if the user does not specify a comparison period, use "last_year"
+- breakdown_dimension is the ONE dimension most relevant to the question for root-cause analysis
+  (e.g., region for geographic questions, category for product questions); default to the region dimension
 
-### Examples:
-- "Why did revenue drop in Q3 2024?" → "absolute" (asking WHY, implies comparison to previous period)
-- "Show me anomalies in revenue for 2024" → "arima" (detecting outliers in a time series)
-- "Compare Q4 sales to Q3" → "absolute" (explicit two-period comparison)
-- "Is there anything unusual about November sales?" → "arima" (looking for unexpected patterns)
-- "What caused the profit spike in October?" → "absolute" (asking WHY a known change happened)
-- "Detect any irregular patterns in customer count" → "arima" (pattern detection)
-- "Revenue dropped 20% - what happened?" → "absolute" (explaining a known change)
-
-Return only the JSON, no additional text.
+{feed_type_guide}Return only the JSON, no additional text.
 """
 
+        self._system_prompt_cache[cache_key] = prompt
+        if len(self._system_prompt_cache) > _SYSTEM_PROMPT_CACHE_SIZE:
+            self._system_prompt_cache.popitem(last=False)
+        logger.debug(
+            "system_prompt_built",
+            bv_version=cache_key[0],
+            prompt_hash=hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest(),
+            prompt_chars=len(prompt),
+        )
         return prompt
 
-    def _json_to_tql_plan(self, parsed_json: Dict[str, Any]) -> TQLPlan:
-        """Convert parsed JSON to TQLPlan object."""
-        sql = parsed_json.get("sql", {})
-
-        # Build metadata
-        metadata = PlanMetadata(
-            estimated_rows=1000,
-            complexity_score=self._calculate_complexity(sql),
-            uses_joins=True,
-                uses_aggregation=True,
-                uses_window_functions=False,
-        )
+    def _build_user_prompt(self, question: str, hints: Optional[Dict[str, Any]] = None) -> str:
+        """Build the per-request part of the SQL generation prompt."""
+        prompt = f"""## Current Date
+{_today_iso()}
 
-        return TQLPlan(
-            current_period_query=sql.get("current_period_query", "SELECT 1"),
-            baseline_period_query=sql.get("baseline_period_query"),
-            timeseries_query=sql.get("timeseries_query"),
-            dimensional_breakdown_query=sql.get("dimensional_breakdown_query"),
-            baseline_dimensional_breakdown_query=sql.get("baseline_dimensional_breakdown_query"),
-            metadata=metadata,
-        )
+## User Question
+"{question}"
+"""
+        if hints:
+            prompt += f"""
+## Pre-classified Intent
+Use these values for the matching fields under "intent":
+{json.dumps(hints)}
+"""
+        return prompt
 
-    def _json_to_parsed_intent(self, parsed_json: Dict[str, Any]) -> ParsedIntent:
-        """Convert parsed JSON to ParsedIntent object."""
-        intent = parsed_json.get("intent", {})
+    @staticmethod
+    def _classify_intent(question: str) -> Dict[str, Any]:
+        """
+        Resolve feed_type and threshold_config locally where unambiguous.
 
-        # Parse time range
-        time_range_data = intent.get("time_range", {})
-        time_range = TimeRange(
-            start_date=datetime.strptime(time_range_data.get("start_date", "2024-01-01"), "%Y-%m-%d").date(),
-            end_date=datetime.strptime(time_range_data.get("end_date", "2024-12-31"), "%Y-%m-%d").date(),
-            granularity=time_range_data.get("granularity", "day"),
-        )
+        feed_type is only returned when the question matches keywords of
+        exactly one feed type; threshold_config only when an explicit
+        amount ("below $1M", "more than 10%") is present.
 
-        # Parse baseline
-        baseline = None
-        baseline_data = intent.get("baseline")
-        if baseline_data:
-            baseline = BaselineConfig(
-                type=BaselineType(baseline_data.get("type", "previous_period")),
-                start_date=datetime.strptime(baseline_data["start_date"], "%Y-%m-%d").date() if baseline_data.get("start_date") else None,
-                end_date=datetime.strptime(baseline_data["end_date"], "%Y-%m-%d").date() if baseline_data.get("end_date") else None,
-            )
+        Returns:
+            Dict with optional "feed_type" and "threshold_config" keys
+        """
+        hints: Dict[str, Any] = {}
+
+        is_absolute = _ABSOLUTE_INTENT_RE.search(question) is not None
+        is_arima = _ARIMA_INTENT_RE.search(question) is not None
+        if is_absolute != is_arima:
+            hints["feed_type"] = FeedType.ABSOLUTE.value if is_absolute else FeedType.ARIMA.value
+
+        match = _THRESHOLD_RE.search(question)
+        if match:
+            direction, currency, number, suffix = match.groups()
+            suffix = (suffix or "").lower()
+            digits = number.replace(",", "")
+            if currency or suffix or len(digits.split(".")[0]) >= 5:
+                value = float(digits) * _MAGNITUDE_SUFFIXES.get(suffix, 1)
+                is_less = direction.lower() in _LESS_THAN_WORDS
+                if suffix == "%":
+                    threshold = {
+                        "operator": "less_than" if is_less else "greater_than",
+                        "value": value,
+                        "compare_to": "percent_change",
+                    }
+                elif _CHANGE_RE.search(question):
+                    threshold = {
+                        "operator": "change_less_than" if is_less else "change_greater_than",
+                        "value": value,
+                        "compare_to": "change",
+                    }
+                else:
+                    threshold = {
+                        "operator": "less_than" if is_less else "greater_than",
+                        "value": value,
+                        "compare_to": "current",
+                    }
+                hints["threshold_config"] = threshold
+
+        return hints
+
+    @staticmethod
+    def _build_tql_plan(
+        parsed_intent: ParsedIntent,
+        bv_context: BVContext,
+        breakdown_dimension: Optional[str] = None,
+    ) -> TQLPlan:
+        """Plan the queries for a resolved intent with TQLPlanner."""
+        if bv_context.business_view is None:
+            raise ValueError("BV context has no Business View to plan against")
+        dimension = LLMSQLGenerator._resolve_breakdown_dimension(breakdown_dimension, bv_context)
+        return TQLPlanner.generate(parsed_intent, bv_context.business_view, breakdown_dimension=dimension)
+
+    @staticmethod
+    def _resolve_intent(parsed_intent: ParsedIntent, bv_context: BVContext) -> ParsedIntent:
+        """
+        Map the LLM's names onto the Business View and fill in the baseline.
 
-        # Parse feed type
-        feed_type_str = intent.get("feed_type", "absolute")
-        feed_type = FeedType.ARIMA if feed_type_str == "arima" else FeedType.ABSOLUTE
+        Measure and filter dimension names are matched case-insensitively.
+        An unknown name raises ValueError instead of being dropped, so the
+        returned filters are exactly the ones the plan applies.
+        """
+        metric = LLMSQLGenerator._match_name(parsed_intent.metric, bv_context.measures_info)
+        if metric is None:
+            raise ValueError(f"Measure '{parsed_intent.metric}' not found in Business View")
+
+        filters = {}
+        for name, values in parsed_intent.filters.items():
+            dimension = LLMSQLGenerator._match_name(name, bv_context.dimensions_info)
+            if dimension is None:
+                raise ValueError(f"Dimension '{name}' not found in Business View")
+            filters[dimension] = values
+
+        return parsed_intent.model_copy(update={
+            "metric": metric,
+            "filters": filters,
+            "baseline": LLMSQLGenerator._resolve_baseline(parsed_intent),
+        })
 
-        # Parse threshold config (new value-based thresholds)
-        threshold_config = None
-        threshold_config_data = intent.get("threshold_config")
-        if threshold_config_data:
-            try:
-                operator_str = threshold_config_data.get("operator", "greater_than")
-                operator = ComparisonOperator(operator_str)
-                threshold_config = ThresholdConfig(
-                    operator=operator,
-                    value=float(threshold_config_data.get("value", 0)),
-                    compare_to=threshold_config_data.get("compare_to", "current"),
-                )
-            except (ValueError, KeyError) as e:
-                logger.warning("failed_to_parse_threshold_config", error=str(e))
-                threshold_config = None
-
-        return ParsedIntent(
-            metric=intent.get("metric", "Revenue"),
-            time_range=time_range,
-            filters=intent.get("filters", {}),
-            baseline=baseline,
-            feed_type=feed_type,
-            threshold=intent.get("threshold"),  # Legacy support
-            threshold_config=threshold_config,
+    @staticmethod
+    def _match_name(name: Optional[str], known: Dict[str, Any]) -> Optional[str]:
+        """Return the BV name matching name exactly or case-insensitively."""
+        if not name:
+            return None
+        if name in known:
+            return name
+        lowered = name.lower()
+        return next((key for key in known if key.lower() == lowered), None)
+
+    @staticmethod
+    def _resolve_baseline(parsed_intent: ParsedIntent) -> BaselineConfig:
+        """Baseline for the intent, defaulting to the same period last year."""
+        baseline = parsed_intent.baseline or BaselineConfig(type=BaselineType.LAST_YEAR)
+        try:
+            baseline.compute_dates(parsed_intent.time_range)
+            return baseline
+        except ValueError:
+            # e.g. Feb 29 has no counterpart last year, or a custom baseline without dates
+            return BaselineConfig(type=BaselineType.PREVIOUS_PERIOD)
+
+    @staticmethod
+    def _resolve_breakdown_dimension(name: Optional[str], bv_context: BVContext) -> Optional[str]:
+        """Dimension to break down by, defaulting to a region dimension."""
+        dimension = LLMSQLGenerator._match_name(name, bv_context.dimensions_info)
+        if dimension is not None:
+            return dimension
+        if name:
+            logger.warning("unknown_breakdown_dimension", dimension=name)
+        return next(
+            (key for key in bv_context.dimensions_info if "region" in key.lower()),
+            next(iter(bv_context.dimensions_info), None),
         )
-
-    def _calculate_complexity(self, sql: Dict[str, Any]) -> int:
-        """Calculate query complexity score (1-10)."""
-        score = 1
-
-        # Count queries
-        for key, query in sql.items():
-            if query:
-                score += 1
-                # Check for JOINs
-                if query and "JOIN" in query.upper():
-                    score += 1
-
-        return min(score, 10)
-
-    def get_alert_config(self, parsed_json: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract alert configuration from LLM response."""
-        return parsed_json.get("alert_config", {
-            "should_trigger_alert": False,
-            "alert_type": "unknown",
-            "severity": "low",
-            "threshold_percent": 5.0,
-            "description": "No alert configured",
-        })
@@ -1,14 +1,100 @@
 """Narrative Generator - Create human-readable insight narratives using LLM."""
 
+import asyncio
+import hashlib
 import json
+from collections import OrderedDict
+import httpx
+from typing import Any, Dict, List, Optional, Tuple
 from app.models.detection import DetectionResult
 from app.models.insight import DeepInsight, Driver
 from app.models.intent import ParsedIntent
+from app.services.llm_clients import get_api_error, get_async_client
 from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Process-wide cap on in-flight narrative calls, so bursts queue here instead
+# of tripping the provider's rate limits and spending the retry budget
+_NARRATIVE_CONCURRENCY = asyncio.Semaphore(settings.NARRATIVE_MAX_CONCURRENT_REQUESTS)
+
+# Tool the LLM is forced to call, so the narrative comes back as typed
+# arguments instead of JSON embedded in prose
+_NARRATIVE_TOOL_NAME = "emit_narrative"
+_NARRATIVE_TOOL_DESCRIPTION = "Return the insight narrative."
+_NARRATIVE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "what_happened": {"type": "string", "maxLength": 150},
+        "why_happened": {"type": "string"},
+    },
+    "required": ["what_happened", "why_happened"],
+}
+
+# Static narrative instructions, sent as a cacheable system block; the
+# per-insight evidence goes in the user message (see _build_prompt)
+_NARRATIVE_SYSTEM_PROMPT = """You are generating an insight narrative for Tellius Intelligent Feed.
+
+You are given COMPUTED EVIDENCE in the user message. Your job is to write a clear, concise narrative.
+
+DO NOT compute any numbers yourself. Use ONLY the numbers provided in the evidence.
+
+Generate a narrative with TWO parts:
+
+1. **what_happened**: A single concise sentence (max 150 characters) stating what changed.
+   - Focus on the metric, direction, and magnitude
+   - Example: "Revenue in APAC declined from $2.4M to $2.0M over the last 8 weeks"
+
+2. **why_happened**: 2-3 sentences explaining WHY it happened.
+   - Cite the top 2-3 contributing drivers with specific numbers
+   - Use data-driven language
+   - Be specific and actionable
+   - Example: "The decline was primarily driven by a 23% drop in Enterprise segment sales ($-350K impact) and a 12% decrease in Product A sales ($-180K impact). These were partially offset by 8% growth in SMB segment."
+
+Tone:
+- Professional and data-driven
+- Confident but not alarmist
+- Specific numbers, not vague language
+- Action-oriented
+
+Call the emit_narrative tool with both parts.
+"""
+
+# Evidence prompt templates (str.format), filled in by _build_prompt
+_ABSOLUTE_DETECTION_TEMPLATE = """
+Current Value: {current:.2f}
+Baseline Value: {baseline:.2f}
+Absolute Change: {delta:+.2f}
+Percent Change: {percent:+.1f}%
+Threshold: {threshold}%
+"""
+_ARIMA_DETECTION_TEMPLATE = """
+Anomalies Detected: {anomalies}
+Severe Anomalies: {severe}
+Total Data Points: {total_points}
+"""
+_DRIVER_TEMPLATE = (
+    "{rank}. {member} ({dimension})\n"
+    "   - Impact: {sign}{impact:.2f}\n"
+    "   - Current Contribution: {current:.1f}%\n"
+    "   - Baseline Contribution: {baseline:.1f}%\n"
+    "   - Shift: {shift:+.1f} percentage points"
+)
+_EVIDENCE_PROMPT_TEMPLATE = """Metric: {metric}
+
+Time Range: {start} to {end}
+{filters}
+
+Detection Result:
+{detection}
+
+Top Contributing Drivers (ranked by impact):
+{drivers}
+
+Explainability Score: {explainability:.1f}/100
+"""
+
 
 class NarrativeGenerator:
     """
@@ -22,21 +108,29 @@ class NarrativeGenerator:
 
     def __init__(self):
         self.provider = settings.LLM_PROVIDER.lower()
-        
-        if self.provider == "openai":
-            from openai import OpenAI
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            self.model = settings.OPENAI_MODEL
-        else:
-            from anthropic import Anthropic
-            self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-            self.model = settings.ANTHROPIC_MODEL
+
+        # Shared async client so the LLM round-trip does not block the event
+        # loop and connections are pooled across generators. Narratives get a
+        # tighter read timeout than the shared default: a stuck call should
+        # fall back rather than hold the request
+        self.client = get_async_client(self.provider).with_options(
+            timeout=httpx.Timeout(settings.NARRATIVE_REQUEST_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+        )
+        self._api_error = get_api_error(self.provider)
+        self.model = (
+            settings.OPENAI_NARRATIVE_MODEL if self.provider == "openai" else settings.ANTHROPIC_NARRATIVE_MODEL
+        )
+
+        # LRU of narratives keyed by a hash of the evidence prompt; the prompt
+        # is a pure function of the computed evidence, so repeats are free
+        self._narrative_cache: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
 
     async def generate(
         self,
         detection_result: DetectionResult,
         deep_insight: DeepInsight,
         intent: ParsedIntent,
+        top_drivers: Optional[List[Driver]] = None,
     ) -> tuple[str, str]:
         """
         Generate insight narrative.
@@ -45,154 +139,267 @@ class NarrativeGenerator:
             detection_result: Detection engine result
             deep_insight: Deep insight analysis result
             intent: Parsed user intent
+            top_drivers: Drivers to cite, already ranked by impact (default:
+                top 5 of deep_insight)
 
         Returns:
             Tuple of (what_happened, why_happened)
         """
         logger.info("generating_narrative", metric=intent.metric, provider=self.provider)
 
-        # Build prompt with computed evidence
-        prompt = self._build_prompt(detection_result, deep_insight, intent)
+        if top_drivers is None:
+            top_drivers = deep_insight.get_top_n_drivers(5)
 
-        # Call LLM based on provider
-        if self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=0.3,
-                messages=[{"role": "user", "content": prompt}],
+        # Build prompt with computed evidence
+        prompt = self._build_prompt(detection_result, deep_insight, intent, top_drivers)
+
+        cache_key = self._narrative_cache_key(prompt)
+        cached = self._narrative_cache.get(cache_key)
+        if cached is not None:
+            self._narrative_cache.move_to_end(cache_key)
+            logger.info("narrative_cache_hit", metric=intent.metric)
+            return cached
+
+        # Call LLM based on provider, forcing the narrative tool; a timed-out
+        # or failed call degrades to the fallback narrative instead of
+        # failing the insight
+        try:
+            narrative_json = await self._request_narrative(prompt)
+        except self._api_error as e:
+            logger.warning("narrative_llm_call_failed", error=str(e), error_type=type(e).__name__)
+            narrative_json = None
+        logger.debug("llm_narrative_response", response=narrative_json)
+
+        if narrative_json is None:
+            # e.g. the response was cut off before the tool call; the fallback
+            # is not cached so the next request tries the LLM again
+            narrative_json = self._generate_fallback_narrative(
+                detection_result, intent, top_drivers
             )
-            response_text = response.choices[0].message.content
+            llm_narrative = False
         else:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=settings.ANTHROPIC_MAX_TOKENS,
-                temperature=0.3,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            response_text = response.content[0].text
-        logger.debug("llm_narrative_response", response=response_text)
-
-        # Parse JSON response
-        try:
-            narrative_json = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Try to extract JSON from markdown
-            if "```json" in response_text:
-                json_str = response_text.split("```json")[1].split("```")[0].strip()
-                narrative_json = json.loads(json_str)
-            elif "```" in response_text:
-                json_str = response_text.split("```")[1].split("```")[0].strip()
-                narrative_json = json.loads(json_str)
-            else:
-                # Fallback: generate simple narrative
-                narrative_json = self._generate_fallback_narrative(
-                    detection_result, deep_insight, intent
-                )
+            llm_narrative = True
 
         what_happened = narrative_json.get("what_happened", "")
         why_happened = narrative_json.get("why_happened", "")
 
         logger.info("narrative_generated", what_len=len(what_happened), why_len=len(why_happened))
 
+        if llm_narrative:
+            self._cache_narrative(cache_key, (what_happened, why_happened))
         return what_happened, why_happened
 
+    async def generate_batch(
+        self,
+        requests: List[Tuple[DetectionResult, DeepInsight, ParsedIntent, List[Driver]]],
+    ) -> List[Tuple[str, str]]:
+        """
+        Generate narratives for many insights in one provider batch.
+
+        With Anthropic, prompts not already in the narrative cache are
+        submitted through the Message Batches API and the batch is polled until it ends; entries that did not
+        succeed are retried with generate(). Other providers fall back to
+        concurrent generate() calls.
+
+        Args:
+            requests: (detection_result, deep_insight, intent, top_drivers) per insight
+
+        Returns:
+            (what_happened, why_happened) tuples in request order
+        """
+        if self.provider == "openai":
+            return list(await asyncio.gather(*(self.generate(*request) for request in requests)))
+
+        logger.info("narrative_batch_started", requests_count=len(requests))
+
+        prompts = [self._build_prompt(*request) for request in requests]
+        cache_keys = [self._narrative_cache_key(prompt) for prompt in prompts]
+        narratives: List[Optional[Tuple[str, str]]] = [
+            self._narrative_cache.get(key) for key in cache_keys
+        ]
+        pending = [index for index, narrative in enumerate(narratives) if narrative is None]
+        if pending:
+            batch = await self.client.messages.batches.create(requests=[
+                {
+                    "custom_id": f"narrative-{index}",
+                    "params": self._anthropic_params(prompts[index]),
+                }
+                for index in pending
+            ])
+            while batch.processing_status != "ended":
+                await asyncio.sleep(settings.LLM_BATCH_POLL_INTERVAL)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+
+            # Results are not guaranteed to come back in request order
+            async for entry in await self.client.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    logger.warning("narrative_batch_entry_failed", custom_id=entry.custom_id, result=entry.result.type)
+                    continue
+                narrative_json = self._tool_input(entry.result.message.content)
+                if narrative_json is not None:
+                    index = int(entry.custom_id.rsplit("-", 1)[1])
+                    narratives[index] = (
+                        narrative_json.get("what_happened", ""),
+                        narrative_json.get("why_happened", ""),
+                    )
+                    self._cache_narrative(cache_keys[index], narratives[index])
+
+        for index, request in enumerate(requests):
+            if narratives[index] is None:
+                narratives[index] = await self.generate(*request)
+
+        logger.info(
+            "narrative_batch_completed",
+            requests_count=len(requests),
+            cache_hits=len(requests) - len(pending),
+        )
+        return narratives
+
+    def _cache_narrative(self, cache_key: str, narrative: Tuple[str, str]) -> None:
+        """Store a narrative in the LRU, evicting the oldest entry if full."""
+        self._narrative_cache[cache_key] = narrative
+        if len(self._narrative_cache) > settings.LLM_RESPONSE_CACHE_SIZE:
+            self._narrative_cache.popitem(last=False)
+
+    def _narrative_cache_key(self, prompt: str) -> str:
+        """
+        Build the narrative cache key.
+
+        The evidence prompt already renders the metric, time range, filters,
+        detection metrics and top drivers, so hashing it (with the model)
+        covers everything the narrative depends on.
+        """
+        raw_key = f"{self.model}|{prompt}"
+        return hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
+
+    async def _request_narrative(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Call the provider, forcing the narrative tool; None if it was not called."""
+        async with _NARRATIVE_CONCURRENCY:
+            return await self._create_narrative(prompt)
+
+    async def _create_narrative(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Single provider round-trip for _request_narrative."""
+        if self.provider == "openai":
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                max_tokens=settings.NARRATIVE_MAX_TOKENS,
+                temperature=0.3,
+                messages=[
+                    {"role": "system", "content": _NARRATIVE_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                tools=[{
+                    "type": "function",
+                    "function": {
+                        "name": _NARRATIVE_TOOL_NAME,
+                        "description": _NARRATIVE_TOOL_DESCRIPTION,
+                        "parameters": _NARRATIVE_SCHEMA,
+                    },
+                }],
+                tool_choice={"type": "function", "function": {"name": _NARRATIVE_TOOL_NAME}},
+            )
+            tool_calls = response.choices[0].message.tool_calls
+            if not tool_calls:
+                return None
+            try:
+                return json.loads(tool_calls[0].function.arguments)
+            except json.JSONDecodeError as e:
+                # Arguments cut off at max_tokens; use the fallback narrative
+                logger.warning("narrative_tool_arguments_unparseable", error=str(e))
+                return None
+
+        response = await self.client.messages.create(**self._anthropic_params(prompt))
+        return self._tool_input(response.content)
+
+    def _anthropic_params(self, prompt: str) -> Dict[str, Any]:
+        """Anthropic request parameters forcing the narrative tool."""
+        return {
+            "model": self.model,
+            "max_tokens": settings.NARRATIVE_MAX_TOKENS,
+            "temperature": 0.3,
+            "system": [
+                {
+                    "type": "text",
+                    "text": _NARRATIVE_SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "messages": [{"role": "user", "content": prompt}],
+            "tools": [{
+                "name": _NARRATIVE_TOOL_NAME,
+                "description": _NARRATIVE_TOOL_DESCRIPTION,
+                "input_schema": _NARRATIVE_SCHEMA,
+            }],
+            "tool_choice": {"type": "tool", "name": _NARRATIVE_TOOL_NAME},
+        }
+
+    @staticmethod
+    def _tool_input(content: List[Any]) -> Optional[Dict[str, Any]]:
+        """Input of the emit_narrative tool call in an Anthropic response."""
+        return next((block.input for block in content if block.type == "tool_use"), None)
+
     def _build_prompt(
         self,
         detection_result: DetectionResult,
         deep_insight: DeepInsight,
         intent: ParsedIntent,
+        top_drivers: List[Driver],
     ) -> str:
-        """Build LLM prompt for narrative generation."""
+        """Build the per-insight evidence prompt for narrative generation."""
 
         # Format detection metrics
         if detection_result.is_absolute():
-            detection_summary = f"""
-Current Value: {detection_result.current_value:.2f}
-Baseline Value: {detection_result.baseline_value:.2f}
-Absolute Change: {detection_result.absolute_delta:+.2f}
-Percent Change: {detection_result.percent_change:+.1f}%
-Threshold: {detection_result.threshold_used}%
-"""
+            detection_summary = _ABSOLUTE_DETECTION_TEMPLATE.format(
+                current=detection_result.current_value,
+                baseline=detection_result.baseline_value,
+                delta=detection_result.absolute_delta,
+                percent=detection_result.percent_change,
+                threshold=detection_result.threshold_used,
+            )
         else:
-            detection_summary = f"""
-Anomalies Detected: {detection_result.get_anomaly_count()}
-Severe Anomalies: {detection_result.get_severe_anomaly_count()}
-Total Data Points: {detection_result.metrics.get('total_points', 'N/A')}
-"""
+            detection_summary = _ARIMA_DETECTION_TEMPLATE.format(
+                anomalies=detection_result.get_anomaly_count(),
+                severe=detection_result.get_severe_anomaly_count(),
+                total_points=detection_result.metrics.get('total_points', 'N/A'),
+            )
 
         # Format top drivers
-        drivers_summary = ""
-        for i, driver in enumerate(deep_insight.get_top_n_drivers(5), 1):
-            impact_sign = "+" if driver.impact > 0 else ""
-            drivers_summary += f"""
-{i}. {driver.member} ({driver.dimension})
-   - Impact: {impact_sign}{driver.impact:.2f}
-   - Current Contribution: {driver.contribution_current:.1f}%
-   - Baseline Contribution: {driver.contribution_baseline:.1f}%
-   - Shift: {driver.shift:+.1f} percentage points
-"""
+        drivers_summary = "\n".join(
+            _DRIVER_TEMPLATE.format(
+                rank=i,
+                member=driver.member,
+                dimension=driver.dimension,
+                sign="+" if driver.impact > 0 else "",
+                impact=driver.impact,
+                current=driver.contribution_current,
+                baseline=driver.contribution_baseline,
+                shift=driver.shift,
+            )
+            for i, driver in enumerate(top_drivers, 1)
+        )
 
         # Format filters
         filters_summary = ""
         if intent.has_filters():
-            filters_summary = "\nFilters Applied:\n"
-            for dim, val in intent.filters.items():
-                filters_summary += f"  - {dim}: {val}\n"
-
-        prompt = f"""You are generating an insight narrative for Tellius Intelligent Feed.
-
-You are given COMPUTED EVIDENCE below. Your job is to write a clear, concise narrative.
-
-DO NOT compute any numbers yourself. Use ONLY the numbers provided below.
-
-Metric: {intent.metric}
-
-Time Range: {intent.time_range.start_date} to {intent.time_range.end_date}
-{filters_summary}
-
-Detection Result:
-{detection_summary}
-
-Top Contributing Drivers (ranked by impact):
-{drivers_summary}
-
-Explainability Score: {deep_insight.explainability_score:.1f}/100
-
-Generate a narrative with TWO parts:
-
-1. **what_happened**: A single concise sentence (max 150 characters) stating what changed.
-   - Focus on the metric, direction, and magnitude
-   - Example: "Revenue in APAC declined from $2.4M to $2.0M over the last 8 weeks"
-
-2. **why_happened**: 2-3 sentences explaining WHY it happened.
-   - Cite the top 2-3 contributing drivers with specific numbers
-   - Use data-driven language
-   - Be specific and actionable
-   - Example: "The decline was primarily driven by a 23% drop in Enterprise segment sales ($-350K impact) and a 12% decrease in Product A sales ($-180K impact). These were partially offset by 8% growth in SMB segment."
-
-Tone:
-- Professional and data-driven
-- Confident but not alarmist
-- Specific numbers, not vague language
-- Action-oriented
-
-Return ONLY valid JSON:
-{{
-  "what_happened": "...",
-  "why_happened": "..."
-}}
-
-Do not include any explanations, only the JSON.
-"""
+            filters_summary = "\nFilters Applied:\n" + "\n".join(
+                f"  - {dim}: {val}" for dim, val in intent.filters.items()
+            )
 
-        return prompt
+        return _EVIDENCE_PROMPT_TEMPLATE.format(
+            metric=intent.metric,
+            start=intent.time_range.start_date,
+            end=intent.time_range.end_date,
+            filters=filters_summary,
+            detection=detection_summary,
+            drivers=drivers_summary,
+            explainability=deep_insight.explainability_score,
+        )
 
     def _generate_fallback_narrative(
         self,
         detection_result: DetectionResult,
-        deep_insight: DeepInsight,
         intent: ParsedIntent,
+        top_drivers: List[Driver],
     ) -> dict:
         """Generate simple fallback narrative if LLM fails."""
 
@@ -211,15 +418,15 @@ Do not include any explanations, only the JSON.
             )
 
         # Build why_happened from top drivers
-        if deep_insight.top_drivers:
-            top_driver = deep_insight.top_drivers[0]
+        if top_drivers:
+            top_driver = top_drivers[0]
             why_happened = (
                 f"The primary driver was {top_driver.member} with an impact of "
                 f"{top_driver.impact:+.2f}. "
             )
 
-            if len(deep_insight.top_drivers) > 1:
-                second_driver = deep_insight.top_drivers[1]
+            if len(top_drivers) > 1:
+                second_driver = top_drivers[1]
                 why_happened += (
                     f"Additional contribution from {second_driver.member} "
                     f"({second_driver.impact:+.2f} impact)."
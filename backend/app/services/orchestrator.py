@@ -1,8 +1,13 @@
 """Intelligent Feed Orchestrator - Coordinates entire insight generation pipeline."""
 
 import asyncio
-from typing import Union, Dict, Any
+import hashlib
+from collections import OrderedDict
+from typing import Union, Dict, Any, List
+import pandas as pd
+from structlog.contextvars import bound_contextvars
 from app.models.business_view import BusinessView
+from app.models.insight import DeepInsight
 from app.models.response import (
     InsightResponseTriggered,
     InsightResponseNotTriggered,
@@ -17,11 +22,39 @@ from app.services import (
     ChartBuilderService,
     NarrativeGenerator,
     LLMSQLGenerator,
+    LLMSQLGeneratorResponse,
 )
+from app.services.llm_response_store import LLMResponseStore
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+_DEEP_INSIGHT_CACHE_SIZE = 256
+# Measure columns of a dimensional breakdown; every other column is a dimension
+_BREAKDOWN_VALUE_COLUMNS = ("value", "metric_value")
+
+
+class _PendingInsight:
+    """Intermediate state of a triggered insight awaiting charts and narrative."""
+
+    __slots__ = (
+        "intent", "plan", "alert_config", "results", "detection_result", "deep_insight",
+        "trend_charts", "top_drivers",
+    )
+
+    def __init__(self, intent, plan, alert_config, results, detection_result, deep_insight, trend_charts):
+        self.intent = intent
+        self.plan = plan
+        self.alert_config = alert_config
+        self.results = results
+        self.detection_result = detection_result
+        self.deep_insight = deep_insight
+        # Built while deep insight ran; driver charts are added later
+        self.trend_charts = trend_charts
+        # Ranked once; the narrative cites these
+        self.top_drivers = deep_insight.get_top_n_drivers(5)
+
 
 class IntelligentFeedOrchestrator:
     """
@@ -50,10 +83,18 @@ class IntelligentFeedOrchestrator:
 
         # Initialize services
         self.bv_context = BVContextBuilder.build(business_view)
-        self.llm_sql_generator = LLMSQLGenerator()
+        self.llm_sql_generator = LLMSQLGenerator(
+            response_store=(
+                LLMResponseStore(settings.LLM_RESPONSE_CACHE_URL)
+                if settings.LLM_RESPONSE_CACHE_TTL > 0 else None
+            )
+        )
         self.tql_adapter = TQLAdapter(db_path)
         self.narrative_generator = NarrativeGenerator()
 
+        # LRU of DeepInsight results keyed by breakdown content hash
+        self._deep_insight_cache: "OrderedDict[str, DeepInsight]" = OrderedDict()
+
         logger.info(
             "orchestrator_initialized",
             business_view=business_view.id,
@@ -73,177 +114,292 @@ class IntelligentFeedOrchestrator:
         Returns:
             InsightResponse (triggered or not triggered)
         """
-        logger.info("insight_generation_started", question=user_question)
+        # Bind the request context once; every event of this request,
+        # including those from tasks and worker threads, inherits it
+        with bound_contextvars(question=user_question, business_view=self.business_view.id):
+            return await self._generate_insight(user_question)
+
+    async def _generate_insight(self, user_question: str) -> InsightResponse:
+        """Run the pipeline for generate_insight."""
+        logger.info("insight_generation_started")
 
         try:
             # STEP 1: Generate SQL and parse intent using LLM
-            logger.info("step_1_llm_sql_generation")
+            logger.debug("step_1_llm_sql_generation")
             llm_response = await self.llm_sql_generator.generate(
                 user_question, self.bv_context
             )
-            
-            intent = llm_response.parsed_intent
-            plan = llm_response.tql_plan
-            alert_config = self.llm_sql_generator.get_alert_config(llm_response.raw_llm_response)
-            
-            logger.info(
-                "llm_sql_generated",
-                metric=intent.metric,
-                feed_type=intent.feed_type.value,
-                queries_count=len(plan.get_all_queries()),
-                alert_type=alert_config.get("alert_type", "unknown"),
-            )
 
-            # STEP 2: Execute LLM-generated SQL queries via TQL Adapter
-            logger.info("step_2_executing_tql_queries")
-            results = self.tql_adapter.execute(plan)
-            logger.info(
-                "tql_queries_executed",
-                current_rows=len(results.current_period) if results.current_period is not None else 0,
-                baseline_rows=len(results.baseline_period) if results.baseline_period is not None else 0,
+            # STEPS 2-5: Execute queries, detect, and analyze drivers
+            analysis = await self._analyze(llm_response)
+            if isinstance(analysis, InsightResponseNotTriggered):
+                return analysis
+
+            # STEP 6 + 7: Build charts and generate narrative concurrently.
+            # Neither depends on the other, so chart building (pandas, run in
+            # a worker thread) overlaps with the narrative LLM round-trip. The
+            # narrative task is scheduled first so its request goes out before
+            # the chart work is handed to the thread pool.
+            logger.debug("step_6_7_building_charts_and_narrative")
+            narrative_task = asyncio.create_task(
+                self.narrative_generator.generate(
+                    analysis.detection_result,
+                    analysis.deep_insight,
+                    analysis.intent,
+                    top_drivers=analysis.top_drivers,
+                )
             )
+            charts_task = asyncio.create_task(self._build_charts(analysis))
+            charts, (what_happened, why_happened) = await asyncio.gather(charts_task, narrative_task)
+            logger.info("charts_built", count=len(charts))
+            logger.info("narrative_generated")
 
-            # Check if we have valid data
-            current_value = results.get_current_value()
-            if current_value is None:
-                logger.warning("no_data_for_time_range")
-                return InsightResponseNotTriggered(
-                    triggered=False,
-                    explanation=f"No data found for {intent.metric} in the specified time range ({intent.time_range.start_date} to {intent.time_range.end_date}). The database contains data from 2023-2024.",
-                    suggestion="Try a question with a date range in 2023-2024, for example: 'Why did revenue drop in Q3 2024?'",
-                    metric=intent.metric,
-                    time_range={
-                        "start": str(intent.time_range.start_date),
-                        "end": str(intent.time_range.end_date),
-                    },
-                    filters=intent.filters,
-                    metrics={"current_value": 0.0, "baseline_value": 0.0},
-                )
+            response = self._build_triggered_response(analysis, charts, what_happened, why_happened)
 
-            # STEP 3: Run detection
-            logger.info("step_3_running_detection", feed_type=intent.feed_type.value)
-            detection_result = await self._run_detection(intent, results)
-            logger.info(
-                "detection_completed",
-                triggered=detection_result.triggered,
-                reason=detection_result.trigger_reason,
+            logger.info("insight_generation_completed", triggered=True)
+            return response
+
+        except Exception as e:
+            logger.error("insight_generation_failed", error=str(e), exc_info=True)
+            raise
+
+    async def generate_insights_bulk(self, user_questions: List[str]) -> List[InsightResponse]:
+        """
+        Generate insights for many questions, batching the LLM calls.
+
+        SQL generation and narratives each go through a single provider batch
+        (LLMSQLGenerator.generate_many / NarrativeGenerator.generate_batch),
+        which is cheaper than per-question calls but not interactive; meant
+        for scheduled or bulk workloads.
+
+        Args:
+            user_questions: Natural language questions
+
+        Returns:
+            InsightResponse per question, in the same order
+        """
+        logger.info("bulk_insight_generation_started", questions_count=len(user_questions))
+
+        try:
+            llm_responses = await self.llm_sql_generator.generate_many(
+                user_questions, self.bv_context
+            )
+            analyses = await asyncio.gather(*(self._analyze(r) for r in llm_responses))
+
+            pending = [a for a in analyses if isinstance(a, _PendingInsight)]
+            charts_list, narratives = await asyncio.gather(
+                asyncio.gather(*(self._build_charts(a) for a in pending)),
+                self.narrative_generator.generate_batch(
+                    [
+                        (a.detection_result, a.deep_insight, a.intent, a.top_drivers)
+                        for a in pending
+                    ]
+                ),
             )
 
-            # STEP 4: If not triggered, return early with alert info
-            if not detection_result.triggered:
-                logger.info("insight_not_triggered", reason=detection_result.trigger_reason)
-                return InsightResponseNotTriggered(
-                    triggered=False,
-                    explanation=detection_result.trigger_reason,
-                    suggestion=self._generate_suggestion(detection_result, intent, alert_config),
-                    metric=intent.metric,
-                    time_range={
-                        "start": str(intent.time_range.start_date),
-                        "end": str(intent.time_range.end_date),
-                    },
-                    filters=intent.filters,
-                    metrics=detection_result.metrics,
-                )
+            triggered = iter([
+                self._build_triggered_response(analysis, charts, what_happened, why_happened)
+                for analysis, charts, (what_happened, why_happened) in zip(pending, charts_list, narratives)
+            ])
+            responses = [
+                next(triggered) if isinstance(a, _PendingInsight) else a for a in analyses
+            ]
 
-            # STEP 5: Generate deep insight (only if triggered)
-            logger.info("step_5_generating_deep_insight")
-            deep_insight = await self._generate_deep_insight(results, detection_result)
             logger.info(
-                "deep_insight_generated",
-                drivers=len(deep_insight.top_drivers),
-                explainability=deep_insight.explainability_score,
+                "bulk_insight_generation_completed",
+                questions_count=len(user_questions),
+                triggered=len(pending),
             )
+            return responses
 
-            # STEP 6: Build charts
-            logger.info("step_6_building_charts")
-            # Use timeseries if available (for trend charts), otherwise skip trend chart
-            has_timeseries = results.timeseries is not None and len(results.timeseries) > 0
-            charts = ChartBuilderService.build_all_charts(
-                metric_name=intent.metric,
-                current_timeseries=results.timeseries if has_timeseries else None,
-                baseline_timeseries=None,  # Only pass if we have actual timeseries baseline
-                detection_result=detection_result,
-                deep_insight=deep_insight,
-            )
-            logger.info("charts_built", count=len(charts))
+        except Exception as e:
+            logger.error("bulk_insight_generation_failed", error=str(e), exc_info=True)
+            raise
 
-            # STEP 7: Generate narrative
-            logger.info("step_7_generating_narrative")
-            what_happened, why_happened = await self.narrative_generator.generate(
-                detection_result, deep_insight, intent
-            )
-            logger.info("narrative_generated")
+    async def _analyze(
+        self, llm_response: LLMSQLGeneratorResponse
+    ) -> Union[InsightResponseNotTriggered, _PendingInsight]:
+        """
+        Run steps 2-5 for a generated plan.
 
-            # STEP 8: Build response with alert information
-            logger.info("step_8_building_response")
-            response = InsightResponseTriggered(
-                triggered=True,
-                trigger_reason=detection_result.trigger_reason,
-                what_happened=what_happened,
-                why_happened=why_happened,
-                charts=[chart.to_dict() for chart in charts],
-                confidence=deep_insight.explainability_score,
-                evidence={
-                    "detection": detection_result.metrics,
-                    "drivers": [d.to_dict() for d in deep_insight.get_top_n_drivers(10)],
-                    "insight_summary": deep_insight.to_summary_dict(),
-                    "alert": alert_config,
-                    "llm_generated_sql": {
-                        "current_period": plan.current_period_query,
-                        "baseline_period": plan.baseline_period_query,
-                        "timeseries": plan.timeseries_query,
-                        "dimensional_breakdown": plan.dimensional_breakdown_query,
-                    },
+        Returns the final not-triggered response, or the state needed to
+        build charts and narrative for a triggered insight.
+        """
+        intent = llm_response.parsed_intent
+        plan = llm_response.tql_plan
+        alert_config = llm_response.alert_config
+        
+        logger.info(
+            "llm_sql_generated",
+            metric=intent.metric,
+            feed_type=intent.feed_type.value,
+            queries_count=len(plan.get_all_queries()),
+            alert_type=alert_config.get("alert_type", "unknown"),
+        )
+
+        # STEP 2: Execute LLM-generated SQL queries via TQL Adapter
+        # (each query runs concurrently in its own worker thread)
+        logger.debug("step_2_executing_tql_queries")
+        results = await self.tql_adapter.execute_async(plan)
+        current_value = results.get_current_value()
+        logger.info(
+            "tql_queries_executed",
+            current_value=current_value,
+            has_baseline=results.has_baseline(),
+        )
+
+        # Check if we have valid data
+        if current_value is None:
+            logger.warning("no_data_for_time_range")
+            return InsightResponseNotTriggered(
+                triggered=False,
+                explanation=f"No data found for {intent.metric} in the specified time range ({intent.time_range.start_date} to {intent.time_range.end_date}). The database contains data from 2023-2024.",
+                suggestion="Try a question with a date range in 2023-2024, for example: 'Why did revenue drop in Q3 2024?'",
+                metric=intent.metric,
+                time_range={
+                    "start": intent.time_range.start_date.isoformat(),
+                    "end": intent.time_range.end_date.isoformat(),
                 },
+                filters=intent.filters,
+                metrics={"current_value": 0.0, "baseline_value": 0.0},
+            )
+
+        # STEP 3: Run detection
+        logger.debug("step_3_running_detection", feed_type=intent.feed_type.value)
+        detection_result = await self._run_detection(
+            intent, results, current_value, results.get_baseline_value()
+        )
+        logger.info(
+            "detection_completed",
+            triggered=detection_result.triggered,
+            reason=detection_result.trigger_reason,
+        )
+
+        # STEP 4: If not triggered, return early with alert info
+        if not detection_result.triggered:
+            logger.info("insight_not_triggered", reason=detection_result.trigger_reason)
+            return InsightResponseNotTriggered(
+                triggered=False,
+                explanation=detection_result.trigger_reason,
+                suggestion=self._generate_suggestion(detection_result, intent, alert_config),
                 metric=intent.metric,
                 time_range={
-                    "start": str(intent.time_range.start_date),
-                    "end": str(intent.time_range.end_date),
+                    "start": intent.time_range.start_date.isoformat(),
+                    "end": intent.time_range.end_date.isoformat(),
                 },
                 filters=intent.filters,
+                metrics=detection_result.metrics,
             )
 
-            logger.info("insight_generation_completed", triggered=True)
-            return response
+        # STEP 5: Generate deep insight (only if triggered). The trend chart
+        # needs only the time-series and detection result, so it is built in
+        # parallel (both are pandas work in worker threads)
+        logger.debug("step_5_generating_deep_insight")
+        deep_insight, trend_charts = await asyncio.gather(
+            self._generate_deep_insight(results, detection_result),
+            asyncio.to_thread(
+                ChartBuilderService.build_trend_charts,
+                metric_name=intent.metric,
+                current_timeseries=results.timeseries,
+                baseline_timeseries=None,  # Only pass if we have actual timeseries baseline
+                detection_result=detection_result,
+            ),
+        )
+        logger.info(
+            "deep_insight_generated",
+            drivers=len(deep_insight.top_drivers),
+            explainability=deep_insight.explainability_score,
+        )
 
-        except Exception as e:
-            logger.error("insight_generation_failed", error=str(e), exc_info=True)
-            raise
+        return _PendingInsight(
+            intent, plan, alert_config, results, detection_result, deep_insight, trend_charts
+        )
 
-    async def _run_detection(self, intent, results):
-        """Run appropriate detection engine based on feed type."""
-        if intent.feed_type.value == "absolute":
-            # Absolute detection requires current and baseline values
-            current_value = results.get_current_value() or 0
-            baseline_value = results.get_baseline_value() or 0
-
-            # Use new threshold_config if available, otherwise fall back to legacy threshold
-            detection_result = AbsoluteDetectionEngine.detect(
-                current_value=current_value,
-                baseline_value=baseline_value,
-                threshold_config=intent.threshold_config,
-                threshold=intent.threshold,  # Legacy fallback
+    async def _build_charts(self, analysis: _PendingInsight) -> List[Dict[str, Any]]:
+        """
+        Add the driver charts to the trend charts and serialize them.
+
+        Both steps are pandas/dict work and run in a worker thread.
+        """
+        def build() -> List[Dict[str, Any]]:
+            driver_charts = ChartBuilderService.build_driver_charts(
+                metric_name=analysis.intent.metric,
+                baseline_timeseries=None,
+                deep_insight=analysis.deep_insight,
             )
-        else:
+            return [chart.to_dict() for chart in analysis.trend_charts + driver_charts]
+
+        return await asyncio.to_thread(build)
+
+    def _build_triggered_response(
+        self,
+        analysis: _PendingInsight,
+        charts: List[Dict[str, Any]],
+        what_happened: str,
+        why_happened: str,
+    ) -> InsightResponseTriggered:
+        """Build the triggered response with alert information."""
+        intent = analysis.intent
+        plan = analysis.plan
+        detection_result = analysis.detection_result
+        deep_insight = analysis.deep_insight
+        alert_config = analysis.alert_config
+
+        # STEP 8: Build response with alert information
+        logger.debug("step_8_building_response")
+        return InsightResponseTriggered(
+            triggered=True,
+            trigger_reason=detection_result.trigger_reason,
+            what_happened=what_happened,
+            why_happened=why_happened,
+            charts=charts,
+            confidence=deep_insight.explainability_score,
+            evidence={
+                "detection": detection_result.metrics,
+                **deep_insight.materialize_evidence(top_n=10),
+                "alert": alert_config,
+                "llm_generated_sql": {
+                    "current_period": plan.current_period_query,
+                    "baseline_period": plan.baseline_period_query,
+                    "timeseries": plan.timeseries_query,
+                    "dimensional_breakdown": plan.dimensional_breakdown_query,
+                },
+            },
+            metric=intent.metric,
+            time_range={
+                "start": intent.time_range.start_date.isoformat(),
+                "end": intent.time_range.end_date.isoformat(),
+            },
+            filters=intent.filters,
+        )
+
+    async def _run_detection(self, intent, results, current_value, baseline_value):
+        """
+        Run appropriate detection engine based on feed type.
+
+        current_value and baseline_value are the period values already read
+        from results (None when a period has no data).
+        """
+        if intent.feed_type.value == "arima":
             # ARIMA detection requires time-series
             if results.timeseries is not None and len(results.timeseries) > 0:
-                detection_result = ARIMADetectionEngine.detect(
+                # Model fitting is CPU-bound; keep it off the event loop
+                return await asyncio.to_thread(
+                    ARIMADetectionEngine.detect,
                     timeseries_df=results.timeseries,
                     sensitivity=intent.threshold if intent.threshold else None,
                 )
-            else:
-                logger.warning("no_timeseries_data_for_arima")
-                # Fallback to absolute if time-series not available
-                current_value = results.get_current_value() or 0
-                baseline_value = results.get_baseline_value() or 0
-                detection_result = AbsoluteDetectionEngine.detect(
-                    current_value=current_value,
-                    baseline_value=baseline_value,
-                    threshold_config=intent.threshold_config,
-                    threshold=intent.threshold,
-                )
-
-        return detection_result
+            # Fallback to absolute if time-series not available
+            logger.warning("no_timeseries_data_for_arima")
+
+        # Absolute detection requires current and baseline values. Use new
+        # threshold_config if available, otherwise fall back to legacy threshold
+        return AbsoluteDetectionEngine.detect(
+            current_value=current_value or 0,
+            baseline_value=baseline_value or 0,
+            threshold_config=intent.threshold_config,
+            threshold=intent.threshold,  # Legacy fallback
+        )
 
     async def _generate_deep_insight(self, results, detection_result):
         """Generate deep insight from query results."""
@@ -254,7 +410,6 @@ class IntelligentFeedOrchestrator:
         if current_breakdown is None or len(current_breakdown) == 0:
             logger.warning("no_dimensional_breakdown_available")
             # Return empty insight
-            from app.models.insight import DeepInsight
             return DeepInsight(
                 top_drivers=[],
                 explainability_score=0.0,
@@ -263,19 +418,50 @@ class IntelligentFeedOrchestrator:
 
         # Determine dimension name from breakdown
         # Assume first non-'value' column is the dimension
-        dimension_cols = [col for col in current_breakdown.columns if col not in ['value', 'metric_value']]
-        dimension_name = dimension_cols[0] if dimension_cols else "dimension"
-
-        # Perform deep insight analysis
-        deep_insight = DeepInsightEngine.analyze(
+        dimension_cols = current_breakdown.columns.difference(_BREAKDOWN_VALUE_COLUMNS, sort=False)
+        dimension_name = dimension_cols[0] if len(dimension_cols) else "dimension"
+
+        # Without a baseline breakdown the current one stands in (every shift
+        # is zero). analyze() only reads its inputs, so no copy is needed.
+        if baseline_breakdown is None:
+            baseline_breakdown = current_breakdown
+
+        # The analysis depends only on the two breakdowns, so identical data
+        # (same question over the same window) reuses the earlier result
+        cache_key = await asyncio.to_thread(
+            self._breakdown_key, current_breakdown, baseline_breakdown, dimension_name
+        )
+        cached = self._deep_insight_cache.get(cache_key)
+        if cached is not None:
+            self._deep_insight_cache.move_to_end(cache_key)
+            logger.info("deep_insight_cache_hit", dimension=dimension_name)
+            return cached
+
+        # Perform deep insight analysis (pandas work, run in a worker thread)
+        deep_insight = await asyncio.to_thread(
+            DeepInsightEngine.analyze,
             current_breakdown=current_breakdown,
-            baseline_breakdown=baseline_breakdown if baseline_breakdown is not None else current_breakdown.copy(),
+            baseline_breakdown=baseline_breakdown,
             detection_result=detection_result,
             dimension_name=dimension_name,
         )
 
+        self._deep_insight_cache[cache_key] = deep_insight
+        if len(self._deep_insight_cache) > _DEEP_INSIGHT_CACHE_SIZE:
+            self._deep_insight_cache.popitem(last=False)
         return deep_insight
 
+    @staticmethod
+    def _breakdown_key(
+        current_breakdown: pd.DataFrame, baseline_breakdown: pd.DataFrame, dimension_name: str
+    ) -> str:
+        """Content hash of the deep insight inputs (values, index and columns)."""
+        digest = hashlib.blake2b(dimension_name.encode(), digest_size=16)
+        for frame in (current_breakdown, baseline_breakdown):
+            digest.update("\0".join(map(str, frame.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
+
     def _generate_suggestion(self, detection_result, intent, alert_config: Dict[str, Any]) -> str:
         """Generate suggestion when insight is not triggered."""
         alert_type = alert_config.get("alert_type", "unknown")
@@ -293,6 +479,7 @@ class IntelligentFeedOrchestrator:
             )
 
     def close(self):
-        """Close database connections."""
+        """Close database connections and background tasks."""
         self.tql_adapter.close()
+        self.llm_sql_generator.close()
         logger.info("orchestrator_closed")
@@ -1,13 +1,35 @@
 """Plan Validator - Validates SQL plans for security and Tellius compatibility."""
 
+import hashlib
 import re
-from typing import List, Set, Dict
+from collections import OrderedDict
+from typing import List, Set, Dict, Optional, Tuple
 from app.models.plan import TQLPlan
 from app.services.bv_context_builder import BVContext
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Patterns compiled once at import; _SECURITY_TOKEN_RE is built from
+# PlanValidator.DANGEROUS_KEYWORDS below the class
+_SUSPICIOUS_COMMENT_RES = [
+    re.compile(r"--.*[;]"),  # Comment followed by semicolon
+    re.compile(r";\s*--"),  # Semicolon followed by comment
+    re.compile(r"/\*.*\*/.*[;]"),  # Block comment with semicolon
+]
+# table.column or column references
+_COLUMN_RE = re.compile(r"\b([a-zA-Z_][a-zA-Z0-9_]*\.)?([a-zA-Z_][a-zA-Z0-9_]*)\b")
+# Text after each "AS " (lookahead, so "AS AS x" yields both aliases)
+_ALIAS_RE = re.compile(r"\bAS\s+(?=([\w.]*))", re.IGNORECASE)
+_QUALIFIED_COLUMN_RE = re.compile(r"\b[a-zA-Z_][a-zA-Z0-9_]*\.[a-zA-Z_][a-zA-Z0-9_]*\b")
+_AGGREGATION_RE = re.compile(r"\b(SUM|COUNT|AVG|MIN|MAX)\s*\(", re.IGNORECASE)
+_GROUP_BY_RE = re.compile(r"\bGROUP\s+BY\b", re.IGNORECASE)
+
+# LRU of plans that passed validation, keyed by a hash of their queries and
+# the BV version (validation is a pure function of both)
+_VALIDATED_PLANS: "OrderedDict[str, bool]" = OrderedDict()
+_VALIDATED_PLANS_SIZE = 4096
+
 
 class ValidationError(Exception):
     """Raised when SQL plan validation fails."""
@@ -100,10 +122,18 @@ class PlanValidator:
         Raises:
             ValidationError: If validation fails
         """
-        logger.info("validating_tql_plan", queries_count=len(plan.get_all_queries()))
+        queries = plan.get_all_queries()
+
+        cache_key = PlanValidator._cache_key(queries, bv_context)
+        if cache_key in _VALIDATED_PLANS:
+            _VALIDATED_PLANS.move_to_end(cache_key)
+            logger.debug("tql_plan_validation_cache_hit", queries_count=len(queries))
+            return plan
+
+        logger.info("validating_tql_plan", queries_count=len(queries))
 
         # Validate each query in the plan
-        for query_name, query_sql in plan.get_all_queries():
+        for query_name, query_sql in queries:
             try:
                 PlanValidator._validate_query(query_sql, query_name, bv_context)
             except ValidationError as e:
@@ -115,55 +145,79 @@ class PlanValidator:
                 )
                 raise
 
+        # Only accepted plans are cached; rejections re-run and re-raise
+        _VALIDATED_PLANS[cache_key] = True
+        if len(_VALIDATED_PLANS) > _VALIDATED_PLANS_SIZE:
+            _VALIDATED_PLANS.popitem(last=False)
+
         logger.info("tql_plan_validated_successfully")
         return plan
 
+    @staticmethod
+    def _cache_key(queries: List[Tuple[str, str]], bv_context: BVContext) -> str:
+        """Hash of (query name, SQL) pairs plus the BV version."""
+        digest = hashlib.blake2b(digest_size=16)
+        for query_name, query_sql in queries:
+            digest.update(f"{query_name}\0{query_sql}\0".encode())
+        digest.update(bv_context.version_hash().encode())
+        return digest.hexdigest()
+
     @staticmethod
     def _validate_query(query: str, query_name: str, bv_context: BVContext) -> None:
         """Validate a single SQL query."""
-        # 1. Check for dangerous keywords
-        PlanValidator._check_dangerous_keywords(query, query_name)
+        # Uppercased once and shared by the checks that need it
+        query_upper = query.upper()
 
-        # 2. Check for SQL injection patterns
-        PlanValidator._check_sql_injection(query, query_name)
+        # 1 + 2. Check for dangerous keywords and SQL injection patterns
+        PlanValidator._check_security(query, query_name)
 
         # 3. Validate column references
         PlanValidator._validate_column_references(query, query_name, bv_context)
 
         # 4. Check for proper structure
-        PlanValidator._validate_query_structure(query, query_name)
+        PlanValidator._validate_query_structure(query, query_name, query_upper)
 
         # 5. Check aggregation usage
-        PlanValidator._validate_aggregation(query, query_name)
+        PlanValidator._validate_aggregation(query, query_name, query_upper)
 
     @staticmethod
-    def _check_dangerous_keywords(query: str, query_name: str) -> None:
-        """Check for dangerous SQL keywords."""
-        query_upper = query.upper()
+    def _check_security(query: str, query_name: str) -> None:
+        """
+        Check for dangerous keywords and common SQL injection patterns.
 
-        for keyword in PlanValidator.DANGEROUS_KEYWORDS:
-            # Match keyword as whole word (not part of another word)
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, query_upper):
+        A single scan collects every token these checks look at (dangerous
+        keywords, UNION, SELECT, comment markers, semicolons); the checks
+        then run on the tallies in their original precedence order.
+        """
+        has_comment = False
+        has_union = False
+        select_count = 0
+        semicolon_positions = []
+
+        for match in _SECURITY_TOKEN_RE.finditer(query):
+            kind = match.lastgroup
+            if kind == "danger":
+                # Dangerous keywords take precedence over everything else
+                keyword = match.group("danger").upper()
                 raise ValidationError(
                     message=f"Dangerous SQL keyword detected: {keyword}",
                     query_name=query_name,
                     details=f"Query contains forbidden keyword '{keyword}' which could be used for malicious operations",
                 )
+            elif kind == "select":
+                select_count += 1
+            elif kind == "semicolon":
+                semicolon_positions.append(match.start())
+            elif kind == "union":
+                has_union = True
+            else:
+                has_comment = True
 
-    @staticmethod
-    def _check_sql_injection(query: str, query_name: str) -> None:
-        """Check for common SQL injection patterns."""
         # Check for suspicious comment patterns
-        if "--" in query or "/*" in query or "*/" in query:
+        if has_comment:
             # Allow comments at the end of lines, but be cautious
-            suspicious_comment_patterns = [
-                r"--.*[;]",  # Comment followed by semicolon
-                r";\s*--",  # Semicolon followed by comment
-                r"/\*.*\*/.*[;]",  # Block comment with semicolon
-            ]
-            for pattern in suspicious_comment_patterns:
-                if re.search(pattern, query):
+            for pattern in _SUSPICIOUS_COMMENT_RES:
+                if pattern.search(query):
                     raise ValidationError(
                         message="Suspicious comment pattern detected",
                         query_name=query_name,
@@ -172,14 +226,13 @@ class PlanValidator:
 
         # Check for multiple statements (semicolons)
         # Allow semicolon only at the very end
-        semicolon_count = query.count(";")
-        if semicolon_count > 1:
+        if len(semicolon_positions) > 1:
             raise ValidationError(
                 message="Multiple SQL statements detected",
                 query_name=query_name,
                 details="Query contains multiple semicolons, which could indicate SQL injection",
             )
-        elif semicolon_count == 1 and not query.rstrip().endswith(";"):
+        elif semicolon_positions and query[semicolon_positions[0] + 1:].strip():
             raise ValidationError(
                 message="Semicolon in middle of query",
                 query_name=query_name,
@@ -187,7 +240,7 @@ class PlanValidator:
             )
 
         # Check for UNION attacks
-        if re.search(r'\bUNION\b', query, re.IGNORECASE):
+        if has_union:
             raise ValidationError(
                 message="UNION keyword detected",
                 query_name=query_name,
@@ -196,7 +249,7 @@ class PlanValidator:
 
         # Check for subqueries (could be used for injection)
         # Allow subqueries in specific contexts, but be restrictive
-        nested_select_count = query.upper().count("SELECT") - 1  # Subtract main SELECT
+        nested_select_count = select_count - 1  # Subtract main SELECT
         if nested_select_count > 0:
             # For now, disallow subqueries entirely (can be relaxed if needed)
             raise ValidationError(
@@ -211,51 +264,36 @@ class PlanValidator:
         # Extract potential column references from the query
         # This is a simplified approach - could be enhanced with SQL parsing
 
-        # Pattern to match table.column or column references
-        column_pattern = r'\b([a-zA-Z_][a-zA-Z0-9_]*\.)?([a-zA-Z_][a-zA-Z0-9_]*)\b'
+        # Every prefix of the text after each "AS ": a reference is an alias
+        # if the text after some AS starts with it
+        alias_prefixes = {
+            alias[:end]
+            for alias in _ALIAS_RE.findall(query.lower())
+            for end in range(1, len(alias) + 1)
+        }
 
         # Get all potential column references
         potential_columns = set()
-        for match in re.finditer(column_pattern, query):
+        for match in _COLUMN_RE.finditer(query):
             full_match = match.group(0)
 
-            # Skip SQL keywords
-            if full_match.upper() in PlanValidator.ALLOWED_KEYWORDS:
-                continue
-
-            # Skip aggregation functions
-            if full_match.upper() in ["COUNT", "SUM", "AVG", "MIN", "MAX", "DISTINCT"]:
-                continue
-
-            # Skip common SQL terms
-            if full_match.upper() in ["NULL", "TRUE", "FALSE", "ASC", "DESC"]:
+            # Skip SQL keywords, aggregation functions and common SQL terms
+            if full_match.upper() in _NON_COLUMN_WORDS:
                 continue
 
             # Skip aliases (AS keyword followed by identifier)
-            if re.search(r'\bAS\s+' + re.escape(full_match), query, re.IGNORECASE):
+            if full_match.lower() in alias_prefixes:
                 continue
 
             potential_columns.add(full_match)
 
-        # Validate each column reference
+        # Validate each column reference: an allowed name, or the trailing
+        # part of a qualified one (e.g. "revenue" for "sales_fact.revenue")
+        allowed_columns = bv_context.allowed_columns
+        allowed_suffixes = bv_context.allowed_column_suffixes
         invalid_columns = []
         for col_ref in potential_columns:
-            # Check if it's in allowed columns (exact match or partial match)
-            is_valid = False
-
-            # Check exact match
-            if col_ref in bv_context.allowed_columns:
-                is_valid = True
-
-            # Check if it's part of a qualified column name
-            for allowed_col in bv_context.allowed_columns:
-                if allowed_col.endswith("." + col_ref) or allowed_col == col_ref:
-                    is_valid = True
-                    break
-                # Also check if col_ref contains table.column format
-                if "." in col_ref and col_ref == allowed_col:
-                    is_valid = True
-                    break
+            is_valid = col_ref in allowed_columns or col_ref in allowed_suffixes
 
             if not is_valid:
                 # Give benefit of doubt for numeric literals and string literals
@@ -278,9 +316,11 @@ class PlanValidator:
             # )
 
     @staticmethod
-    def _validate_query_structure(query: str, query_name: str) -> None:
+    def _validate_query_structure(query: str, query_name: str, query_upper: Optional[str] = None) -> None:
         """Validate basic SQL query structure."""
-        query_upper = query.upper().strip()
+        if query_upper is None:
+            query_upper = query.upper()
+        query_upper = query_upper.strip()
 
         # Must start with SELECT
         if not query_upper.startswith("SELECT"):
@@ -309,27 +349,23 @@ class PlanValidator:
             )
 
     @staticmethod
-    def _validate_aggregation(query: str, query_name: str) -> None:
+    def _validate_aggregation(query: str, query_name: str, query_upper: Optional[str] = None) -> None:
         """Validate proper use of aggregation functions."""
-        query_upper = query.upper()
-
         # Check if query has aggregation functions
-        has_aggregation = any(
-            agg in query_upper for agg in ["SUM(", "COUNT(", "AVG(", "MIN(", "MAX("]
-        )
+        has_aggregation = _AGGREGATION_RE.search(query) is not None
 
         # If it has aggregation, it should have GROUP BY (unless it's a simple aggregation)
         # This is a simplified check - could be enhanced
         if has_aggregation:
             # Check if there are non-aggregated columns in SELECT
             # If so, should have GROUP BY
-            select_clause = PlanValidator._extract_select_clause(query)
+            select_clause = PlanValidator._extract_select_clause(query, query_upper)
 
             # Simple heuristic: if SELECT has both aggregations and column references,
             # we expect GROUP BY
-            has_plain_columns = bool(re.search(r'\b[a-zA-Z_][a-zA-Z0-9_]*\.[a-zA-Z_][a-zA-Z0-9_]*\b', select_clause))
+            has_plain_columns = bool(_QUALIFIED_COLUMN_RE.search(select_clause))
 
-            if has_plain_columns and "GROUP BY" not in query_upper:
+            if has_plain_columns and not _GROUP_BY_RE.search(query):
                 logger.warning(
                     "aggregation_without_group_by",
                     query_name=query_name,
@@ -338,9 +374,10 @@ class PlanValidator:
                 # Don't fail - this is just a warning for now
 
     @staticmethod
-    def _extract_select_clause(query: str) -> str:
+    def _extract_select_clause(query: str, query_upper: Optional[str] = None) -> str:
         """Extract the SELECT clause from a query."""
-        query_upper = query.upper()
+        if query_upper is None:
+            query_upper = query.upper()
         select_start = query_upper.find("SELECT")
         from_start = query_upper.find("FROM")
 
@@ -358,9 +395,25 @@ class PlanValidator:
             True if query appears safe, False otherwise
         """
         try:
-            query_name = "safety_check"
-            PlanValidator._check_dangerous_keywords(query, query_name)
-            PlanValidator._check_sql_injection(query, query_name)
+            PlanValidator._check_security(query, "safety_check")
             return True
         except ValidationError:
             return False
+
+
+# Words _validate_column_references never treats as column references
+_NON_COLUMN_WORDS = frozenset(PlanValidator.ALLOWED_KEYWORDS) | {
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "DISTINCT",
+    "NULL", "TRUE", "FALSE", "ASC", "DESC",
+}
+
+# Every token PlanValidator._check_security looks at, in one alternation.
+# SELECT is matched as a substring, like the str.count() it replaced.
+_SECURITY_TOKEN_RE = re.compile(
+    r"\b(?P<danger>" + "|".join(map(re.escape, sorted(PlanValidator.DANGEROUS_KEYWORDS))) + r")\b"
+    r"|(?P<union>\bUNION\b)"
+    r"|(?P<select>SELECT)"
+    r"|(?P<comment>--|/\*|\*/)"
+    r"|(?P<semicolon>;)",
+    re.IGNORECASE,
+)
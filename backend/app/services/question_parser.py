@@ -1,117 +1,36 @@
 """Question Parser - Extract structured intent from natural language using LLM."""
 
-import json
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import calendar
+import hashlib
+import re
+from collections import OrderedDict
+from contextlib import aclosing
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
+import orjson
 from app.models.intent import ParsedIntent, TimeRange, BaselineConfig, FeedType, BaselineType
 from app.services.bv_context_builder import BVContext
+from app.services.llm_clients import get_async_client
 from app.core.config import settings
-from app.core.logging import get_logger
+from app.core.logging import DEBUG_ENABLED, get_logger
 
 logger = get_logger(__name__)
 
+# JSON object inside a ``` / ```json markdown fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+_WHITESPACE_RE = re.compile(r"\s+")
 
-class QuestionParser:
-    """Parses natural language questions into structured intents.
-    
-    Supports both OpenAI and Anthropic providers.
-    """
-
-    def __init__(self):
-        self.provider = settings.LLM_PROVIDER.lower()
-        
-        if self.provider == "openai":
-            from openai import OpenAI
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            self.model = settings.OPENAI_MODEL
-        else:
-            from anthropic import Anthropic
-            self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-            self.model = settings.ANTHROPIC_MODEL
-
-    async def parse(self, user_question: str, bv_context: BVContext) -> ParsedIntent:
-        """
-        Parse user question into structured intent.
-
-        Args:
-            user_question: Natural language question from user
-            bv_context: Business View context for grounding
-
-        Returns:
-            ParsedIntent object
-        """
-        logger.info("parsing_question", question=user_question, provider=self.provider)
-
-        # Build prompt for LLM
-        prompt = self._build_prompt(user_question, bv_context)
-
-        # Call LLM based on provider
-        if self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=settings.OPENAI_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            response_text = response.choices[0].message.content
-        else:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=settings.ANTHROPIC_MAX_TOKENS,
-                temperature=settings.ANTHROPIC_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            response_text = response.content[0].text
-        logger.debug("llm_response", response=response_text)
-
-        # Parse JSON
-        try:
-            parsed_json = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Try to extract JSON from markdown code blocks
-            if "```json" in response_text:
-                json_str = response_text.split("```json")[1].split("```")[0].strip()
-                parsed_json = json.loads(json_str)
-            elif "```" in response_text:
-                json_str = response_text.split("```")[1].split("```")[0].strip()
-                parsed_json = json.loads(json_str)
-            else:
-                raise ValueError(f"Failed to parse LLM response as JSON: {response_text}")
-
-        # Convert to ParsedIntent
-        intent = self._json_to_intent(parsed_json)
-
-        logger.info("question_parsed", intent=intent.to_dict())
-
-        return intent
-
-    def _build_prompt(self, question: str, bv_context: BVContext) -> str:
-        """Build LLM prompt for question parsing."""
-
-        measures_list = "\n".join([f"  - {name}: {info['expression']}"
-                                   for name, info in bv_context.measures_info.items()])
 
-        dimensions_list = "\n".join([f"  - {name}"
-                                     for name in bv_context.dimensions_info.keys()])
+@lru_cache(maxsize=1024)
+def _maybe_date(value: Optional[str]) -> Optional[date]:
+    """Parse a YYYY-MM-DD string (None passes through); dates repeat across questions."""
+    return date.fromisoformat(value) if value else None
 
-        prompt = f"""You are parsing a Tellius Intelligent Feed question.
 
-Business View Schema:
-{bv_context.schema_context}
-
-Available Measures:
-{measures_list}
-
-Available Dimensions:
-{dimensions_list}
-
-Time Dimension: {bv_context.time_info['full_name']}
-
-Current Date: {datetime.now().date().isoformat()}
-
-User Question: "{question}"
-
-Extract the following structured information:
+# Extraction instructions, JSON format and rules: identical for every BV and
+# question, appended after the BV-specific part of the prompt
+_PARSE_INSTRUCTIONS = """Extract the following structured information from the user question below:
 
 1. **metric**: Which measure/metric is being analyzed? Use exact measure name from the list above.
 
@@ -122,8 +41,8 @@ Extract the following structured information:
 
 3. **filters**: Which dimensions are being filtered?
    - Extract dimension=value pairs
-   - Example: "in APAC" → {{"Region": "APAC"}}
-   - Example: "for Enterprise" → {{"Segment": "Enterprise"}}
+   - Example: "in APAC" → {"Region": "APAC"}
+   - Example: "for Enterprise" → {"Segment": "Enterprise"}
    - Use exact dimension names from the list above
 
 4. **baseline**: What comparison period is requested?
@@ -142,24 +61,24 @@ Extract the following structured information:
    - Otherwise set to null (will use default 5%)
 
 Return ONLY valid JSON in this exact format:
-{{
+{
   "metric": "exact_measure_name",
-  "time_range": {{
+  "time_range": {
     "start_date": "YYYY-MM-DD",
     "end_date": "YYYY-MM-DD",
     "granularity": "day|week|month"
-  }},
-  "filters": {{
+  },
+  "filters": {
     "DimensionName": "value"
-  }},
-  "baseline": {{
+  },
+  "baseline": {
     "type": "previous_period|last_year|custom",
     "start_date": "YYYY-MM-DD",
     "end_date": "YYYY-MM-DD"
-  }} or null,
+  } or null,
   "feed_type": "absolute|arima",
   "threshold": 5.0 or null
-}}
+}
 
 Rules:
 - Use exact measure and dimension names from schema
@@ -169,15 +88,344 @@ Rules:
 - Return only the JSON, no explanations
 """
 
-        return prompt
+
+class _JSONObjectEnd:
+    """
+    Tracks streamed text until the first top-level JSON object closes.
+
+    Braces inside string literals are ignored. After feed() returns True,
+    start/end delimit the object in the concatenated text.
+    """
+
+    __slots__ = ("start", "end", "_length", "_depth", "_in_string", "_escaped")
+
+    def __init__(self):
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; True once the object is complete."""
+        for offset, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self.start is not None:
+                    self._in_string = True
+            elif char == "{":
+                if self.start is None:
+                    self.start = self._length + offset
+                self._depth += 1
+            elif char == "}" and self.start is not None:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = self._length + offset + 1
+                    return True
+        self._length += len(chunk)
+        return False
+
+
+# Templates FastPathParser answers without the LLM. Each must match the
+# whole (normalized) question, so anything extra such as filters or a
+# comparison period falls through to the LLM.
+_ANOMALY_PREFIX = r"(?:(?P<anomaly>anomal(?:y|ies)|unusual (?:changes|values|activity)) (?:in|for|of) )?"
+_RELATIVE_WINDOW_RE = re.compile(
+    r"(?:show (?:me )?)?" + _ANOMALY_PREFIX
+    + r"(?P<metric>[a-z0-9_ ]+?)(?: (?:trend|change|changes))?"
+    r" (?:(?:in|over|for|during) the )?(?:last|past) (?P<count>\d+) (?P<unit>day|week|month)s?",
+)
+_QUARTER_RE = re.compile(
+    r"(?:show (?:me )?)?" + _ANOMALY_PREFIX
+    + r"(?P<metric>[a-z0-9_ ]+?)(?: (?:trend|change|changes))?"
+    r" (?:in|for|during) q(?P<quarter>[1-4]) (?P<year>\d{4})",
+)
+
+
+def _months_before(day: date, months: int) -> date:
+    """Same day of the month `months` earlier, clamped to the month's length."""
+    year_offset, month_index = divmod(day.month - 1 - months, 12)
+    year = day.year + year_offset
+    month = month_index + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class FastPathParser:
+    """
+    Parses a few rigid question templates locally.
+
+    Covers "<metric> [in the] last N days|weeks|months" and "<metric> in
+    Q<n> YYYY", optionally prefixed with "anomalies in" (ARIMA feed), where
+    <metric> is exactly a BV measure name. Produces the same intent JSON
+    shape the LLM returns, so QuestionParser and LLMSQLGenerator build the
+    intent the same way.
+    """
+
+    @staticmethod
+    def try_parse(
+        question: str, bv_context: BVContext, today: date, relative_windows: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Parse the question if it matches a template.
+
+        Args:
+            question: User question
+            bv_context: Business View context with the measure names
+            today: Date relative periods resolve against
+            relative_windows: Whether to answer "last N ..." questions; off
+                where the LLM would not resolve them against `today`
+
+        Returns:
+            Intent JSON, or None if the question needs the LLM. The baseline
+            is left null, as the parse prompt asks of the LLM when no
+            comparison is mentioned.
+        """
+        question = QuestionParser._normalize(question)
+        match = _RELATIVE_WINDOW_RE.fullmatch(question)
+        if match:
+            if not relative_windows:
+                return None
+            count = int(match.group("count"))
+            if count <= 0:
+                return None
+            unit = match.group("unit")
+            if unit == "day":
+                start_date = today - timedelta(days=count - 1)
+            elif unit == "week":
+                start_date = today - timedelta(weeks=count) + timedelta(days=1)
+            else:
+                start_date = _months_before(today, count) + timedelta(days=1)
+            end_date = today
+            granularity = unit
+        else:
+            match = _QUARTER_RE.fullmatch(question)
+            if not match:
+                return None
+            quarter = int(match.group("quarter"))
+            year = int(match.group("year"))
+            start_date = date(year, 3 * quarter - 2, 1)
+            end_month = 3 * quarter
+            end_date = date(year, end_month, calendar.monthrange(year, end_month)[1])
+            granularity = "week"
+
+        metric = bv_context.measures_by_lower_name.get(match.group("metric"))
+        if metric is None:
+            return None
+
+        return {
+            "metric": metric,
+            "time_range": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "granularity": granularity,
+            },
+            "filters": {},
+            "baseline": None,
+            "feed_type": "arima" if match.group("anomaly") else "absolute",
+            "threshold": None,
+        }
+
+
+class QuestionParser:
+    """Parses natural language questions into structured intents.
+    
+    Supports both OpenAI and Anthropic providers.
+    """
+
+    def __init__(self):
+        self.provider = settings.LLM_PROVIDER.lower()
+        # Shared async client, so the LLM round-trip does not block the loop
+        self.client = get_async_client(self.provider)
+        self.model = settings.OPENAI_MODEL if self.provider == "openai" else settings.ANTHROPIC_MODEL
+
+        # LRU of parsed LLM JSON keyed by (normalized question, BV version, date)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Static prompt prefix per BV version (a handful of BVs per process)
+        self._prefix_cache: Dict[str, str] = {}
+
+    async def parse(self, user_question: str, bv_context: BVContext) -> ParsedIntent:
+        """
+        Parse user question into structured intent.
+
+        Args:
+            user_question: Natural language question from user
+            bv_context: Business View context for grounding
+
+        Returns:
+            ParsedIntent object
+        """
+        logger.info("parsing_question", question=user_question, provider=self.provider)
+
+        # Rigid templates are answered locally, without an LLM round-trip
+        fast_json = FastPathParser.try_parse(user_question, bv_context, date.today())
+        if fast_json is not None:
+            logger.info("fast_path_hit", question=user_question)
+            return self._json_to_intent(fast_json)
+        logger.debug("fast_path_miss", question=user_question)
+
+        cache_key = self._cache_key(user_question, bv_context)
+        cached_json = self._cache.get(cache_key)
+        if cached_json is not None:
+            self._cache.move_to_end(cache_key)
+            logger.info("question_parse_cache_hit", question=user_question)
+            return self._json_to_intent(cached_json)
+
+        # Build prompt for LLM: the BV-scoped instructions form a stable
+        # prefix and the date and question come last, so providers can
+        # cache everything before them
+        static_prefix, dynamic_suffix = self._build_prompt(user_question, bv_context)
+
+        # Stream the completion and stop reading as soon as the JSON object
+        # closes, instead of waiting for any trailing text
+        chunks = []
+        tracker = _JSONObjectEnd()
+        async with aclosing(self._stream_completion(static_prefix, dynamic_suffix)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+                if tracker.feed(chunk):
+                    break
+        response_text = "".join(chunks)
+        if tracker.end is not None:
+            response_text = response_text[tracker.start:tracker.end]
+        logger.debug("llm_response", response=response_text)
+
+        # Parse JSON
+        try:
+            parsed_json = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
+            # Try to extract JSON from markdown code blocks
+            match = _FENCE_RE.search(response_text)
+            if match:
+                parsed_json = orjson.loads(match.group(1))
+            else:
+                raise ValueError(f"Failed to parse LLM response as JSON: {response_text}")
+
+        # Convert to ParsedIntent (before caching, so malformed JSON is not kept)
+        intent = self._json_to_intent(parsed_json)
+
+        self._cache[cache_key] = parsed_json
+        if len(self._cache) > settings.LLM_RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+        logger.info("question_parsed", metric=intent.metric, feed_type=intent.feed_type.value)
+        if DEBUG_ENABLED:
+            logger.debug("parsed_intent", intent=intent.to_dict())
+
+        return intent
+
+    async def _stream_completion(self, static_prefix: str, dynamic_suffix: str) -> AsyncIterator[str]:
+        """Stream response text deltas from the configured provider."""
+        if self.provider == "openai":
+            # OpenAI caches long shared prefixes automatically
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                max_tokens=settings.OPENAI_MAX_TOKENS,
+                temperature=settings.OPENAI_TEMPERATURE,
+                messages=[{"role": "user", "content": static_prefix + dynamic_suffix}],
+                # JSON mode: the reply is a bare object, never fenced
+                response_format={"type": "json_object"},
+                stream=True,
+            )
+            try:
+                async for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        yield event.choices[0].delta.content
+            finally:
+                # Drops the connection when the caller stops early
+                await stream.close()
+        else:
+            # Prefill the opening brace so the reply is bare JSON
+            yield "{"
+            async with self.client.messages.stream(
+                model=self.model,
+                max_tokens=settings.ANTHROPIC_MAX_TOKENS,
+                temperature=settings.ANTHROPIC_TEMPERATURE,
+                messages=[{
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": static_prefix, "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": dynamic_suffix},
+                    ],
+                }, {
+                    "role": "assistant",
+                    "content": "{",
+                }],
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        """Lower-case, collapse whitespace and drop trailing punctuation."""
+        return _WHITESPACE_RE.sub(" ", question).strip().lower().rstrip("?.! ")
+
+    @staticmethod
+    def _cache_key(question: str, bv_context: BVContext) -> str:
+        """
+        Build the parse cache key.
+
+        The question is whitespace-collapsed but keeps its case, since
+        filter values ("US" vs "us") are case-sensitive in the data; the
+        current date is included because relative periods resolve against it.
+        """
+        normalized = _WHITESPACE_RE.sub(" ", question).strip().rstrip("?.! ")
+        raw_key = f"{normalized}|{bv_context.version_hash()}|{date.today().isoformat()}"
+        return hashlib.blake2b(raw_key.encode(), digest_size=16).hexdigest()
+
+    def _build_prompt(self, question: str, bv_context: BVContext) -> Tuple[str, str]:
+        """
+        Build LLM prompt for question parsing.
+
+        Returns:
+            (static_prefix, dynamic_suffix): the BV-scoped instructions,
+            rendered once per BV version, and the date and question
+        """
+        version = bv_context.version_hash()
+        static_prefix = self._prefix_cache.get(version)
+        if static_prefix is None:
+            static_prefix = self._prefix_cache[version] = self._build_static_prefix(bv_context)
+
+        dynamic_suffix = f"""
+Current Date: {datetime.now().date().isoformat()}
+
+User Question: "{question}"
+"""
+
+        return static_prefix, dynamic_suffix
+
+    @staticmethod
+    def _build_static_prefix(bv_context: BVContext) -> str:
+        """Render the question-independent part of the parsing prompt."""
+        head = f"""You are parsing a Tellius Intelligent Feed question.
+
+Business View Schema:
+{bv_context.schema_context}
+
+Available Measures:
+{bv_context.formatted_measures}
+
+Available Dimensions:
+{bv_context.formatted_dimension_names}
+
+Time Dimension: {bv_context.time_info['full_name']}
+
+"""
+        return head + _PARSE_INSTRUCTIONS
 
     def _json_to_intent(self, parsed_json: Dict[str, Any]) -> ParsedIntent:
         """Convert parsed JSON to ParsedIntent object."""
 
         # Parse time range
         time_range = TimeRange(
-            start_date=datetime.strptime(parsed_json['time_range']['start_date'], '%Y-%m-%d').date(),
-            end_date=datetime.strptime(parsed_json['time_range']['end_date'], '%Y-%m-%d').date(),
+            start_date=date.fromisoformat(parsed_json['time_range']['start_date']),
+            end_date=date.fromisoformat(parsed_json['time_range']['end_date']),
             granularity=parsed_json['time_range']['granularity']
         )
 
@@ -186,9 +434,9 @@ Rules:
         if parsed_json.get('baseline'):
             baseline_data = parsed_json['baseline']
             baseline = BaselineConfig(
-                type=BaselineType(baseline_data['type']),
-                start_date=datetime.strptime(baseline_data['start_date'], '%Y-%m-%d').date() if baseline_data.get('start_date') else None,
-                end_date=datetime.strptime(baseline_data['end_date'], '%Y-%m-%d').date() if baseline_data.get('end_date') else None,
+                type=BaselineType._value2member_map_.get(baseline_data.get('type'), BaselineType.PREVIOUS_PERIOD),
+                start_date=_maybe_date(baseline_data.get('start_date')),
+                end_date=_maybe_date(baseline_data.get('end_date')),
             )
 
         # Create ParsedIntent
@@ -197,7 +445,7 @@ Rules:
             time_range=time_range,
             filters=parsed_json.get('filters', {}),
             baseline=baseline,
-            feed_type=FeedType(parsed_json.get('feed_type', 'absolute')),
+            feed_type=FeedType._value2member_map_.get(parsed_json.get('feed_type'), FeedType.ABSOLUTE),
             threshold=parsed_json.get('threshold')
         )
 
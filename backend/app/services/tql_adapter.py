@@ -1,17 +1,40 @@
 """TQL Adapter - Executes SQL queries against SQLite database."""
 
+import asyncio
+import math
+import os
+import re
 import sqlite3
-from typing import Dict, Optional, Any
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
 import pandas as pd
 from contextlib import contextmanager
 
 from app.models.plan import TQLPlan
-from app.core.logging import get_logger
+from app.core.logging import DEBUG_ENABLED, get_logger
 from app.core.config import settings
 
 logger = get_logger(__name__)
 
+# How long a stat() of the database file is trusted (seconds)
+_DB_MTIME_TTL = 1.0
+# Applied once to each pooled connection: a page cache of up to 64 MB
+# (negative = KiB), in-memory temp tables and memory-mapped reads
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA cache_size = -64000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+# Table names get_row_count will interpolate (identifiers cannot be bound)
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Upper bound on the queries in a plan (see TQLPlan.get_all_queries)
+_MAX_PLAN_QUERIES = 5
+
 
 class QueryExecutionError(Exception):
     """Raised when query execution fails."""
@@ -23,19 +46,70 @@ class QueryExecutionError(Exception):
         super().__init__(self.message)
 
 
+# Queries that return a single metric_value row; their value is read straight
+# from the cursor row and a DataFrame is only built if one is asked for
+_SCALAR_QUERIES = frozenset({"current_period", "baseline_period"})
+
+# (column names, rows) as fetched from the cursor
+RawRows = Tuple[List[str], List[tuple]]
+
+
+def _metric_value(raw: RawRows) -> Optional[float]:
+    """metric_value of the first row, or None if there is no row, NULL or NaN."""
+    columns, rows = raw
+    if not rows:
+        return None
+    value = rows[0][columns.index("metric_value")]
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
 class QueryResults:
     """Container for query execution results."""
 
     def __init__(self):
-        self.current_period: Optional[pd.DataFrame] = None
-        self.baseline_period: Optional[pd.DataFrame] = None
+        # Scalar period results: the value, and the raw rows for frame access
+        self.current_value: Optional[float] = None
+        self.baseline_value: Optional[float] = None
+        self._period_rows: Dict[str, RawRows] = {}
+        self._period_frames: Dict[str, pd.DataFrame] = {}
+
         self.timeseries: Optional[pd.DataFrame] = None
         self.dimensional_breakdown: Optional[pd.DataFrame] = None
         self.baseline_dimensional_breakdown: Optional[pd.DataFrame] = None
 
+    def add(self, query_name: str, result: Union[pd.DataFrame, RawRows]) -> None:
+        """Store the result of a plan query (see TQLPlan.get_all_queries)."""
+        if query_name in _SCALAR_QUERIES:
+            self._period_rows[query_name] = result
+            setattr(self, query_name.replace("_period", "_value"), _metric_value(result))
+        else:
+            setattr(self, query_name, result)
+
+    def _period_frame(self, query_name: str) -> Optional[pd.DataFrame]:
+        """Build (once) the DataFrame of a scalar period result."""
+        frame = self._period_frames.get(query_name)
+        if frame is None and query_name in self._period_rows:
+            columns, rows = self._period_rows[query_name]
+            frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            self._period_frames[query_name] = frame
+        return frame
+
+    @property
+    def current_period(self) -> Optional[pd.DataFrame]:
+        """Current period result as a DataFrame."""
+        return self._period_frame("current_period")
+
+    @property
+    def baseline_period(self) -> Optional[pd.DataFrame]:
+        """Baseline period result as a DataFrame."""
+        return self._period_frame("baseline_period")
+
     def has_baseline(self) -> bool:
         """Check if baseline results are available."""
-        return self.baseline_period is not None
+        return "baseline_period" in self._period_rows
 
     def has_timeseries(self) -> bool:
         """Check if time-series results are available."""
@@ -47,22 +121,11 @@ class QueryResults:
 
     def get_current_value(self) -> Optional[float]:
         """Get scalar value from current period query."""
-        if self.current_period is None or self.current_period.empty:
-            return None
-        # Assume single row, single column (metric_value)
-        value = self.current_period.iloc[0]['metric_value']
-        if value is None or (hasattr(value, '__class__') and str(value) == 'nan'):
-            return None
-        return float(value)
+        return self.current_value
 
     def get_baseline_value(self) -> Optional[float]:
         """Get scalar value from baseline period query."""
-        if self.baseline_period is None or self.baseline_period.empty:
-            return None
-        value = self.baseline_period.iloc[0]['metric_value']
-        if value is None or (hasattr(value, '__class__') and str(value) == 'nan'):
-            return None
-        return float(value)
+        return self.baseline_value
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert results to dictionary for logging/debugging."""
@@ -98,50 +161,102 @@ class TQLAdapter:
         else:
             raise ValueError(f"Unsupported database URL format: {self.database_url}")
 
+        # LRU of query results keyed by (SQL, database mtime); the pipeline
+        # only reads these frames, so hits are shared rather than copied
+        self._result_cache: "OrderedDict[Tuple[str, float], Union[pd.DataFrame, RawRows]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        # (monotonic time of the last stat, mtime it returned)
+        self._mtime_cache: Tuple[float, float] = (float("-inf"), 0.0)
+
+        # One long-lived connection per thread, all tracked so close() can
+        # release them. Queries only run on this fixed pool, which bounds the
+        # connections (and their page cache and mmap) per adapter
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(_MAX_PLAN_QUERIES, settings.TQL_MAX_CONNECTIONS), thread_name_prefix="tql"
+        )
+
+        self._enable_wal()
+
         logger.info("tql_adapter_initialized", db_path=self.db_path)
 
+    def _enable_wal(self) -> None:
+        """
+        Switch the database to WAL journaling.
+
+        The mode is persistent, so this only does work the first time. WAL
+        lets the per-query reader connections run alongside a writer.
+        """
+        try:
+            with self._get_connection() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+        except (QueryExecutionError, sqlite3.Error) as e:
+            # Rollback journaling still works, just with less concurrency
+            logger.warning("wal_mode_not_enabled", db_path=self.db_path, error=str(e))
+
     @contextmanager
     def _get_connection(self):
         """
         Get database connection context manager.
 
+        Yields the calling thread's pooled connection, opening and
+        configuring it on first use.
+
         Yields:
             sqlite3.Connection
         """
         conn = None
         try:
-            # Create database file if it doesn't exist
-            db_file = Path(self.db_path)
-            db_file.parent.mkdir(parents=True, exist_ok=True)
-
-            # Connect with timeout
-            conn = sqlite3.connect(
-                self.db_path,
-                timeout=settings.QUERY_TIMEOUT,
-                check_same_thread=False,
-            )
-
-            # Enable foreign keys
-            conn.execute("PRAGMA foreign_keys = ON")
-
-            # Set row factory to return dict-like rows
-            conn.row_factory = sqlite3.Row
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
 
             yield conn
 
         except sqlite3.Error as e:
             logger.error("database_connection_error", error=str(e))
+            # The connection is reused; do not leave a failed write open on it
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
             raise QueryExecutionError(
                 message="Failed to connect to database",
                 original_error=e,
             )
-        finally:
-            if conn:
-                conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a connection for the pool."""
+        # Create database file if it doesn't exist
+        db_file = Path(self.db_path)
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Connect with timeout. The connection is long-lived, so a larger
+        # prepared-statement cache lets repeated SQL skip parse and plan.
+        # Plans bind dates and filter values as "?" parameters, so the SQL
+        # text repeats across intents of the same shape
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=settings.QUERY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+        # Set row factory to return dict-like rows
+        conn.row_factory = sqlite3.Row
+
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
 
     def execute(self, plan: TQLPlan) -> QueryResults:
         """
-        Execute all queries in the TQL plan.
+        Execute all queries in the TQL plan concurrently.
+
+        Blocking counterpart of execute_async for synchronous callers.
 
         Args:
             plan: TQL plan with queries to execute
@@ -159,37 +274,66 @@ class TQLAdapter:
             has_timeseries=plan.requires_timeseries(),
         )
 
+        # The queries are independent: run each on its worker's connection
+        # (SQLite releases the GIL) and wait for all of them
+        queries = plan.get_all_queries()
+        futures = [
+            self._executor.submit(self._execute_cached, query, query_name, plan.get_params(query_name))
+            for query_name, query in queries
+        ]
+        # result() re-raises the QueryExecutionError of a failed query
+        frames = [future.result() for future in futures]
+
         results = QueryResults()
+        for (query_name, _), result in zip(queries, frames):
+            results.add(query_name, result)
 
-        with self._get_connection() as conn:
-            # Execute current period query
-            results.current_period = self._execute_query(
-                conn, plan.current_period_query, "current_period"
-            )
+        logger.info(
+            "tql_plan_executed_successfully",
+            current_value=results.get_current_value(),
+            baseline_value=results.get_baseline_value(),
+        )
 
-            # Execute baseline period query (if present)
-            if plan.baseline_period_query:
-                results.baseline_period = self._execute_query(
-                    conn, plan.baseline_period_query, "baseline_period"
-                )
+        return results
 
-            # Execute time-series query (if present)
-            if plan.timeseries_query:
-                results.timeseries = self._execute_query(
-                    conn, plan.timeseries_query, "timeseries"
-                )
+    async def execute_async(self, plan: TQLPlan) -> QueryResults:
+        """
+        Execute all queries in the TQL plan concurrently.
 
-            # Execute dimensional breakdown query (if present)
-            if plan.dimensional_breakdown_query:
-                results.dimensional_breakdown = self._execute_query(
-                    conn, plan.dimensional_breakdown_query, "dimensional_breakdown"
-                )
+        Each query runs on the adapter's worker pool, on that thread's
+        connection (SQLite allows concurrent readers and releases the GIL
+        while stepping), so the plan costs roughly its slowest query instead
+        of the sum.
 
-            # Execute baseline dimensional breakdown query (if present)
-            if plan.baseline_dimensional_breakdown_query:
-                results.baseline_dimensional_breakdown = self._execute_query(
-                    conn, plan.baseline_dimensional_breakdown_query, "baseline_dimensional_breakdown"
-                )
+        Args:
+            plan: TQL plan with queries to execute
+
+        Returns:
+            QueryResults with all executed query results
+
+        Raises:
+            QueryExecutionError: If query execution fails
+        """
+        queries = plan.get_all_queries()
+        logger.info(
+            "executing_tql_plan",
+            queries_count=len(queries),
+            has_baseline=plan.requires_baseline(),
+            has_timeseries=plan.requires_timeseries(),
+            concurrent=True,
+        )
+
+        loop = asyncio.get_running_loop()
+        frames = await asyncio.gather(*(
+            loop.run_in_executor(
+                self._executor, self._execute_cached, query, query_name, plan.get_params(query_name)
+            )
+            for query_name, query in queries
+        ))
+
+        results = QueryResults()
+        for (query_name, _), result in zip(queries, frames):
+            results.add(query_name, result)
 
         logger.info(
             "tql_plan_executed_successfully",
@@ -199,8 +343,62 @@ class TQLAdapter:
 
         return results
 
+    def _execute_cached(
+        self, query: str, query_name: str, params: tuple = ()
+    ) -> Union[pd.DataFrame, RawRows]:
+        """
+        Execute a single query on the calling thread's pooled connection.
+
+        Scalar period queries return their raw rows, everything else a
+        DataFrame. Results are reused while the database file is unchanged,
+        so a repeated question skips SQLite entirely.
+        """
+        if settings.QUERY_RESULT_CACHE_SIZE <= 0:
+            return self._execute_plan_query(query, query_name, params)
+
+        cache_key = (query, params, self._db_mtime())
+        with self._result_cache_lock:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+        if cached is not None:
+            logger.debug("query_result_cache_hit", query_name=query_name)
+            return cached
+
+        result = self._execute_plan_query(query, query_name, params)
+
+        with self._result_cache_lock:
+            self._result_cache[cache_key] = result
+            while len(self._result_cache) > settings.QUERY_RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return result
+
+    def _execute_plan_query(
+        self, query: str, query_name: str, params: tuple = ()
+    ) -> Union[pd.DataFrame, RawRows]:
+        """Run a plan query, skipping the DataFrame for scalar period queries."""
+        with self._get_connection() as conn:
+            if query_name in _SCALAR_QUERIES:
+                return self._fetch_rows(conn, query, query_name, params)
+            return self._execute_query(conn, query, query_name, params)
+
+    def _db_mtime(self) -> float:
+        """Modification time of the database file, re-read at most once a second."""
+        now = time.monotonic()
+        checked_at, mtime = self._mtime_cache
+        if now - checked_at > _DB_MTIME_TTL:
+            # In WAL mode commits land in the -wal file until a checkpoint
+            mtime = 0.0
+            for path in (self.db_path, f"{self.db_path}-wal"):
+                try:
+                    mtime = max(mtime, os.path.getmtime(path))
+                except OSError:
+                    pass
+            self._mtime_cache = (now, mtime)
+        return mtime
+
     def _execute_query(
-        self, conn: sqlite3.Connection, query: str, query_name: str
+        self, conn: sqlite3.Connection, query: str, query_name: str, params: tuple = ()
     ) -> pd.DataFrame:
         """
         Execute a single SQL query and return results as DataFrame.
@@ -209,6 +407,7 @@ class TQLAdapter:
             conn: Database connection
             query: SQL query to execute
             query_name: Name of the query (for logging)
+            params: Values for the query's "?" placeholders
 
         Returns:
             pandas DataFrame with query results
@@ -216,31 +415,52 @@ class TQLAdapter:
         Raises:
             QueryExecutionError: If query execution fails
         """
-        logger.debug("executing_query", query_name=query_name, query=query[:200])
+        # from_records skips read_sql_query's wrapper and dtype reconstruction
+        columns, rows = self._fetch_rows(conn, query, query_name, params)
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
 
-        try:
-            # Execute query with pandas for easier DataFrame conversion
-            df = pd.read_sql_query(query, conn)
+    def _fetch_rows(
+        self, conn: sqlite3.Connection, query: str, query_name: str, params: tuple = ()
+    ) -> RawRows:
+        """
+        Execute a single SQL query and return its column names and rows.
 
-            logger.info(
-                "query_executed_successfully",
-                query_name=query_name,
-                rows_returned=len(df),
-                columns=list(df.columns),
-            )
+        Raises:
+            QueryExecutionError: If query execution fails
+        """
+        if DEBUG_ENABLED:
+            logger.debug("executing_query", query_name=query_name, query=query[:200])
+
+        try:
+            # Plain tuples instead of sqlite3.Row objects
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description or ()]
+            # Step SQLite for at most one row past the limit (the sentinel
+            # tells us the limit was hit), so a runaway query is never
+            # materialized in full
+            rows = cursor.fetchmany(settings.MAX_QUERY_ROWS + 1)
+            cursor.close()
 
             # Check row limit
-            if len(df) > settings.MAX_QUERY_ROWS:
+            if len(rows) > settings.MAX_QUERY_ROWS:
                 logger.warning(
                     "query_exceeds_row_limit",
                     query_name=query_name,
-                    rows=len(df),
                     limit=settings.MAX_QUERY_ROWS,
                 )
-                # Truncate to limit
-                df = df.head(settings.MAX_QUERY_ROWS)
+                # Drop the sentinel row
+                rows.pop()
 
-            return df
+            logger.info(
+                "query_executed_successfully",
+                query_name=query_name,
+                rows_returned=len(rows),
+                column_count=len(columns),
+            )
+
+            return columns, rows
 
         except sqlite3.Error as e:
             logger.error(
@@ -255,18 +475,6 @@ class TQLAdapter:
                 original_error=e,
             )
 
-        except pd.errors.DatabaseError as e:
-            logger.error(
-                "pandas_query_error",
-                query_name=query_name,
-                error=str(e),
-            )
-            raise QueryExecutionError(
-                message=f"Pandas query error: {str(e)}",
-                query_name=query_name,
-                original_error=e,
-            )
-
         except Exception as e:
             logger.error(
                 "unexpected_query_error",
@@ -353,8 +561,15 @@ class TQLAdapter:
         Returns:
             True if table exists, False otherwise
         """
-        tables = self.list_tables()
-        return table_name in tables
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?",
+                    (table_name,),
+                ).fetchone()
+        except QueryExecutionError:
+            return False
+        return row is not None
 
     def get_row_count(self, table_name: str) -> Optional[int]:
         """
@@ -366,15 +581,16 @@ class TQLAdapter:
         Returns:
             Number of rows, or None if table doesn't exist
         """
-        if not self.table_exists(table_name):
+        if not _IDENTIFIER_RE.match(table_name):
             return None
 
+        # One round trip: a missing table fails the COUNT itself
         try:
-            query = f"SELECT COUNT(*) as count FROM {table_name}"
-            df = self.execute_raw_query(query)
-            return int(df.iloc[0]['count'])
+            with self._get_connection() as conn:
+                row = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()
         except QueryExecutionError:
             return None
+        return int(row[0])
 
     def initialize_database(self, schema_sql: Optional[str] = None) -> None:
         """
@@ -388,6 +604,8 @@ class TQLAdapter:
                 try:
                     conn.executescript(schema_sql)
                     conn.commit()
+                    # Re-stat on the next lookup so cached results see this write
+                    self._mtime_cache = (float("-inf"), 0.0)
                     logger.info("database_initialized_successfully")
                 except sqlite3.Error as e:
                     logger.error("database_initialization_failed", error=str(e))
@@ -410,6 +628,8 @@ class TQLAdapter:
             try:
                 conn.executescript(sql_script)
                 conn.commit()
+                # Re-stat on the next lookup so cached results see this write
+                self._mtime_cache = (float("-inf"), 0.0)
                 logger.info("sql_script_executed_successfully")
             except sqlite3.Error as e:
                 logger.error("sql_script_execution_failed", error=str(e))
@@ -419,6 +639,11 @@ class TQLAdapter:
                 )
 
     def close(self):
-        """Close the adapter (no-op for SQLite with context manager)."""
+        """Close the adapter's worker pool and pooled connections."""
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
         logger.info("tql_adapter_closed")
-        pass
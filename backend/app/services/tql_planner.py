@@ -1,14 +1,40 @@
 """TQL Plan Generator - Converts parsed intent into executable SQL/TQL plans."""
 
-from typing import List, Set, Dict
-from app.models.business_view import BusinessView
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, List, Optional, Set, Dict, Tuple
+from app.models.business_view import BusinessView, DenormalizedTable, Dimension, Join, Measure, Rollup
 from app.models.intent import ParsedIntent, FeedType
 from app.models.plan import TQLPlan, PlanMetadata
 from app.services.bv_context_builder import BVContext, BVContextBuilder
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Generated plans, LRU keyed on (intent cache key, BV version hash,
+# breakdown dimension, TQL_PREFER_DENORMALIZED). Plans are shared between
+# callers and must be treated as read-only.
+_plan_cache: "OrderedDict[Tuple[tuple, str, Optional[str], bool], TQLPlan]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+# Measures a roll-up answers exactly: a SUM of +/- combined summed columns,
+# or a distinct count of one of its key columns
+_ROLLUP_SUM_RE = re.compile(r"\s*SUM\(\s*([\w.]+(?:\s*[+-]\s*[\w.]+)*)\s*\)\s*", re.IGNORECASE)
+_ROLLUP_COUNT_DISTINCT_RE = re.compile(r"\s*COUNT\(\s*DISTINCT\s+([\w.]+)\s*\)\s*", re.IGNORECASE)
+_ADDITIVE_OPERATOR_RE = re.compile(r"\s*[+-]\s*")
+# Table part of the qualified column references in a measure expression
+_QUALIFIED_TABLE_RE = re.compile(r"\b([A-Za-z_]\w*)\.[A-Za-z_]\w*")
+
+
+def _source_column(reference: str, source_table: str) -> Optional[str]:
+    """Column name of a bare or `source_table.`-qualified reference, else None."""
+    table, _, column = reference.rpartition(".")
+    if table and table != source_table:
+        return None
+    return column
+
 
 class TQLPlanner:
     """
@@ -23,13 +49,19 @@ class TQLPlanner:
     """
 
     @staticmethod
-    def generate(intent: ParsedIntent, business_view: BusinessView) -> TQLPlan:
+    def generate(
+        intent: ParsedIntent,
+        business_view: BusinessView,
+        breakdown_dimension: Optional[str] = None,
+    ) -> TQLPlan:
         """
         Generate complete TQL plan from parsed intent.
 
         Args:
             intent: Parsed user intent
             business_view: Business View with schema and metadata
+            breakdown_dimension: Only break down by this dimension (default:
+                every dimension connected to the measure's table)
 
         Returns:
             TQLPlan with all necessary queries
@@ -37,6 +69,38 @@ class TQLPlanner:
         Raises:
             ValueError: If intent references invalid measures/dimensions
         """
+        prefer_denormalized = settings.TQL_PREFER_DENORMALIZED
+        cache_key = (
+            intent.cache_key(), business_view.version_hash(), breakdown_dimension, prefer_denormalized
+        )
+        with _plan_cache_lock:
+            plan = _plan_cache.get(cache_key)
+            if plan is not None:
+                _plan_cache.move_to_end(cache_key)
+        if plan is not None:
+            logger.debug("tql_plan_cache_hit", metric=intent.metric)
+            return plan
+
+        plan = TQLPlanner._generate(
+            intent, business_view, cache_key[1], breakdown_dimension, prefer_denormalized
+        )
+
+        with _plan_cache_lock:
+            _plan_cache[cache_key] = plan
+            if len(_plan_cache) > settings.TQL_PLAN_CACHE_SIZE:
+                _plan_cache.popitem(last=False)
+
+        return plan
+
+    @staticmethod
+    def _generate(
+        intent: ParsedIntent,
+        business_view: BusinessView,
+        bv_version: str,
+        breakdown_dimension: Optional[str] = None,
+        prefer_denormalized: bool = False,
+    ) -> TQLPlan:
+        """Build the plan for generate() (uncached)."""
         logger.info(
             "generating_tql_plan",
             metric=intent.metric,
@@ -45,7 +109,7 @@ class TQLPlanner:
         )
 
         # Build BV context
-        bv_context = BVContextBuilder.build(business_view)
+        bv_context = BVContextBuilder.build_cached(business_view, bv_version)
 
         # Validate intent against BV
         TQLPlanner._validate_intent(intent, business_view)
@@ -55,36 +119,91 @@ class TQLPlanner:
         if not measure:
             raise ValueError(f"Measure '{intent.metric}' not found in Business View")
 
+        breakdown_dimensions = business_view.dimensions
+        if breakdown_dimension is not None:
+            dimension = business_view.get_dimension(breakdown_dimension)
+            if not dimension:
+                raise ValueError(f"Dimension '{breakdown_dimension}' not found in Business View")
+            breakdown_dimensions = [dimension]
+
         # Determine required tables
-        tables_needed = TQLPlanner._get_required_tables(intent, business_view, bv_context)
+        tables_needed = TQLPlanner._get_required_tables(
+            intent, business_view, bv_context, breakdown_dimensions
+        )
+        # Breakdowns can only project dimensions whose table got joined in
+        breakdown_dimensions = [dim for dim in breakdown_dimensions if dim.table in tables_needed]
+
+        # Every query shares the FROM clause and one of two WHERE clauses.
+        # A denormalized fact table (if preferred) replaces all the joins;
+        # otherwise an additive measure reads the fact table's roll-up
+        denormalized = None
+        if prefer_denormalized:
+            denormalized = TQLPlanner._select_denormalized(
+                intent, measure, business_view, tables_needed, breakdown_dimensions
+            )
+        if denormalized:
+            logger.debug("tql_plan_uses_denormalized", table=denormalized.table, metric=intent.metric)
+            source = denormalized.source_table
+            # Dimension columns are read from the denormalized copy, which
+            # is aliased to the fact table's name
+            column_refs = {
+                qualified: f"{source}.{column}" for qualified, column in denormalized.columns.items()
+            }
+            tables_needed = [source]
+            from_clause = f"FROM {denormalized.table} AS {source}"
+        else:
+            column_refs = {}
+            rollup = TQLPlanner._select_rollup(measure, business_view, tables_needed)
+            if rollup:
+                logger.debug("tql_plan_uses_rollup", rollup=rollup.table, metric=intent.metric)
+            from_clause = TQLPlanner._build_from_clause(tables_needed, business_view, rollup)
+        where_clause, where_params = TQLPlanner._build_where_clause(
+            intent, business_view, is_baseline=False, column_refs=column_refs
+        )
+        baseline_where_clause, baseline_where_params = None, []
+        if intent.has_baseline():
+            baseline_where_clause, baseline_where_params = TQLPlanner._build_where_clause(
+                intent, business_view, is_baseline=True, column_refs=column_refs
+            )
+        params = {"current_period": where_params}
 
         # Build queries
         current_period_query = TQLPlanner._build_current_period_query(
-            intent, measure, business_view, bv_context, tables_needed
+            measure, from_clause, where_clause
         )
 
         baseline_period_query = None
         if intent.has_baseline():
             baseline_period_query = TQLPlanner._build_baseline_period_query(
-                intent, measure, business_view, bv_context, tables_needed
+                measure, from_clause, baseline_where_clause
             )
+            params["baseline_period"] = baseline_where_params
 
         timeseries_query = None
         if intent.feed_type == FeedType.ARIMA:
+            time_col = business_view.time_dimension.full_column_name
             timeseries_query = TQLPlanner._build_timeseries_query(
-                intent, measure, business_view, bv_context, tables_needed
+                measure, column_refs.get(time_col, time_col), from_clause, where_clause
             )
+            params["timeseries"] = where_params
 
         dimensional_breakdown_query = None
         baseline_dimensional_breakdown_query = None
         if intent.has_baseline():
-            # Generate dimensional breakdowns for RCA
+            # Generate dimensional breakdowns for RCA. The two periods stay
+            # separate queries: each is an index range scan over its own
+            # dates, so one fused scan would read the same rows on one
+            # connection instead of two in parallel
             dimensional_breakdown_query = TQLPlanner._build_dimensional_breakdown_query(
-                intent, measure, business_view, bv_context, tables_needed, is_baseline=False
+                measure, breakdown_dimensions, from_clause, where_clause,
+                is_baseline=False, column_refs=column_refs,
             )
             baseline_dimensional_breakdown_query = TQLPlanner._build_dimensional_breakdown_query(
-                intent, measure, business_view, bv_context, tables_needed, is_baseline=True
+                measure, breakdown_dimensions, from_clause, baseline_where_clause,
+                is_baseline=True, column_refs=column_refs,
             )
+            params["dimensional_breakdown"] = where_params
+            params["baseline_dimensional_breakdown"] = baseline_where_params
 
         # Build metadata
         metadata = PlanMetadata(
@@ -101,6 +220,7 @@ class TQLPlanner:
             timeseries_query=timeseries_query,
             dimensional_breakdown_query=dimensional_breakdown_query,
             baseline_dimensional_breakdown_query=baseline_dimensional_breakdown_query,
+            params=params,
             metadata=metadata,
         )
 
@@ -127,122 +247,247 @@ class TQLPlanner:
 
     @staticmethod
     def _get_required_tables(
-        intent: ParsedIntent, bv: BusinessView, context: BVContext
+        intent: ParsedIntent,
+        bv: BusinessView,
+        context: BVContext,
+        breakdown_dimensions: Optional[List[Dimension]] = None,
     ) -> List[str]:
-        """Determine which tables are needed for this query."""
-        tables = set()
+        """
+        Determine which tables are needed for this query.
+
+        Breakdown-only dimension tables (of breakdown_dimensions, default
+        all dimensions) are included only when joins connect them to the
+        measure's table; a disconnected one would be a cross product (or an
+        unknown table) in the FROM clause.
+
+        The measure's table comes first, then the others in the order they
+        are first needed, so the FROM clause built from the list is stable.
+        """
+        # Insertion-ordered set
+        tables: Dict[str, None] = {}
 
         # Add table for measure
         measure_table = BVContextBuilder.get_table_for_measure(bv, intent.metric)
         if measure_table:
-            tables.add(measure_table)
+            tables[measure_table] = None
+            reachable = bv.tables_reachable_from(measure_table)
+        else:
+            reachable = None
 
         # Add table for time dimension
-        tables.add(bv.time_dimension.table)
+        tables[bv.time_dimension.table] = None
 
         # Add tables for filtered dimensions
         for dim_name in intent.filters.keys():
             dim = bv.get_dimension(dim_name)
             if dim:
-                tables.add(dim.table)
+                tables[dim.table] = None
 
-        # Add tables for all dimensions (for breakdown queries)
-        for dim in bv.dimensions:
-            tables.add(dim.table)
+        # Add tables for the connected breakdown dimensions
+        if breakdown_dimensions is None:
+            breakdown_dimensions = bv.dimensions
+        for dim in breakdown_dimensions:
+            if reachable is None or dim.table in reachable:
+                tables[dim.table] = None
 
         return list(tables)
 
     @staticmethod
-    def _build_from_clause(tables: List[str], bv: BusinessView) -> str:
-        """Build FROM clause with necessary JOINs."""
-        if len(tables) == 1:
-            return f"FROM {tables[0]}"
+    def _select_rollup(measure: Measure, bv: BusinessView, tables: List[str]) -> Optional[Rollup]:
+        """
+        Find a roll-up that gives the same results as its fact table here.
 
-        # Always start with sales_fact (the fact table) if it's in the list
-        fact_table = "sales_fact"
-        if fact_table in tables:
-            start_table = fact_table
-        else:
-            start_table = tables[0]
-        
-        from_parts = [f"FROM {start_table}"]
-
-        # Get required joins
-        required_joins = BVContextBuilder.get_required_joins(bv, tables)
-
-        # Add JOIN clauses - iterate multiple times to ensure all tables are connected
-        joined_tables = {start_table}
-        tables_to_join = set(tables) - joined_tables
-        
-        max_iterations = len(tables) + 1
-        iteration = 0
-        
-        while tables_to_join and iteration < max_iterations:
-            iteration += 1
-            for join in required_joins:
-                # Add join if it connects a new table
-                if join['left_table'] in joined_tables and join['right_table'] not in joined_tables:
-                    from_parts.append(
-                        f"{join['join_type'].upper()} JOIN {join['right_table']} "
-                        f"ON {join['left_table']}.{join['left_key']} = {join['right_table']}.{join['right_key']}"
-                    )
-                    joined_tables.add(join['right_table'])
-                    tables_to_join.discard(join['right_table'])
-                elif join['right_table'] in joined_tables and join['left_table'] not in joined_tables:
-                    from_parts.append(
-                        f"{join['join_type'].upper()} JOIN {join['left_table']} "
-                        f"ON {join['right_table']}.{join['right_key']} = {join['left_table']}.{join['left_key']}"
-                    )
-                    joined_tables.add(join['left_table'])
-                    tables_to_join.discard(join['left_table'])
+        The measure must be a SUM of summed columns combined with + and -, or
+        a COUNT(DISTINCT) of a key column, and every fact column the plan
+        can touch (join keys, dimension and time columns) must be a key.
+        """
+        for rollup in bv.rollups:
+            source = rollup.source_table
+            if source not in tables:
+                continue
+            keys = set(rollup.key_columns)
+
+            match = _ROLLUP_SUM_RE.fullmatch(measure.expression)
+            if match:
+                references = _ADDITIVE_OPERATOR_RE.split(match.group(1))
+                allowed = set(rollup.summed_columns)
+            else:
+                match = _ROLLUP_COUNT_DISTINCT_RE.fullmatch(measure.expression)
+                if not match:
+                    continue
+                references = [match.group(1)]
+                allowed = keys
+            if any(_source_column(ref, source) not in allowed for ref in references):
+                continue
+
+            used_columns = {
+                join.left_key if join.left_table == source else join.right_key
+                for _, join in bv.join_adjacency.get(source, ())
+            }
+            used_columns.update(dim.column for dim in bv.dimensions if dim.table == source)
+            if bv.time_dimension.table == source:
+                used_columns.add(bv.time_dimension.column)
+            if used_columns <= keys:
+                return rollup
+        return None
+
+    @staticmethod
+    def _select_denormalized(
+        intent: ParsedIntent,
+        measure: Measure,
+        bv: BusinessView,
+        tables: List[str],
+        breakdown_dimensions: Optional[List[Dimension]] = None,
+    ) -> Optional[DenormalizedTable]:
+        """
+        Find a denormalized copy of the fact table that can answer the plan alone.
+
+        The measure may only reference the fact table, and every other column
+        the plan reads (time, filter and breakdown dimensions) must have been
+        copied in.
+        """
+        for denormalized in bv.denormalized_tables:
+            source = denormalized.source_table
+            if source not in tables:
+                continue
+            if any(table != source for table in _QUALIFIED_TABLE_RE.findall(measure.expression)):
+                continue
+
+            needed_columns = {bv.time_dimension.full_column_name}
+            needed_columns.update(
+                dim.full_column_name
+                for dim in (bv.dimensions if breakdown_dimensions is None else breakdown_dimensions)
+                if dim.table in tables
+            )
+            for dim_name in intent.filters:
+                dim = bv.get_dimension(dim_name)
+                if dim:
+                    needed_columns.add(dim.full_column_name)
+            if all(
+                column.startswith(f"{source}.") or column in denormalized.columns
+                for column in needed_columns
+            ):
+                return denormalized
+        return None
+
+    @staticmethod
+    def _build_from_clause(tables: List[str], bv: BusinessView, rollup: Optional[Rollup] = None) -> str:
+        """
+        Build FROM clause with necessary JOINs.
+
+        With a roll-up, its table is aliased to the fact table's name, so
+        the qualified column references stay unchanged.
+        """
+        def table_ref(table: str) -> str:
+            if rollup and table == rollup.source_table:
+                return f"{rollup.table} AS {table}"
+            return table
+
+        if len(tables) == 1:
+            return f"FROM {table_ref(tables[0])}"
+
+        # Start from the measure's table (listed first by _get_required_tables)
+        start_table = tables[0]
+
+        # BFS from the start table, remembering the join each table was
+        # first reached through
+        needed = set(tables)
+        adjacency = bv.join_adjacency
+        reached_via: Dict[str, Tuple[str, Join]] = {}
+        reach_order = []
+        visited = {start_table}
+        queue = deque([start_table])
+        while queue and not needed <= visited:
+            table = queue.popleft()
+            for neighbor, join in adjacency.get(table, ()):
+                if neighbor in visited:
+                    continue
+                visited.add(neighbor)
+                reached_via[neighbor] = (table, join)
+                reach_order.append(neighbor)
+                queue.append(neighbor)
+
+        # Keep the needed tables plus any table on their path from the start
+        on_path = set()
+        for table in needed:
+            while table in reached_via and table not in on_path:
+                on_path.add(table)
+                table = reached_via[table][0]
+
+        from_parts = [f"FROM {table_ref(start_table)}"]
+        for table in reach_order:
+            if table not in on_path:
+                continue
+            join = reached_via[table][1]
+            if join.right_table == table:
+                condition = f"{join.left_table}.{join.left_key} = {join.right_table}.{join.right_key}"
+            else:
+                condition = f"{join.right_table}.{join.right_key} = {join.left_table}.{join.left_key}"
+            from_parts.append(f"{join.join_type.value.upper()} JOIN {table_ref(table)} ON {condition}")
 
         return "\n".join(from_parts)
 
     @staticmethod
-    def _build_where_clause(intent: ParsedIntent, bv: BusinessView, is_baseline: bool = False) -> str:
-        """Build WHERE clause with time range and filters."""
+    def _build_where_clause(
+        intent: ParsedIntent,
+        bv: BusinessView,
+        is_baseline: bool = False,
+        column_refs: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, List[Any]]:
+        """
+        Build WHERE clause with time range and filters.
+
+        Dates and filter values are bound as "?" parameters, so the SQL text
+        only depends on the shape of the intent (and SQLite's statement
+        cache can reuse it across values).
+
+        Args:
+            column_refs: SQL to use in place of qualified dimension columns
+
+        Returns:
+            (WHERE clause or "", parameters in placeholder order)
+        """
+        column_refs = column_refs or {}
         conditions = []
+        params: List[Any] = []
 
         # Time range condition
         time_col = bv.time_dimension.full_column_name
-        if is_baseline:
-            baseline_range = intent.get_baseline_range()
-            if baseline_range:
-                conditions.append(baseline_range.to_sql_condition(time_col))
-        else:
-            conditions.append(intent.time_range.to_sql_condition(time_col))
+        time_col = column_refs.get(time_col, time_col)
+        time_range = intent.get_baseline_range() if is_baseline else intent.time_range
+        if time_range:
+            conditions.append(f"{time_col} BETWEEN ? AND ?")
+            params.append(time_range.start_date.isoformat())
+            params.append(time_range.end_date.isoformat())
 
         # Add dimension filters
         if intent.has_filters():
             for dim_name, values in intent.filters.items():
                 dim = bv.get_dimension(dim_name)
                 if dim:
-                    col = dim.full_column_name
+                    col = column_refs.get(dim.full_column_name, dim.full_column_name)
                     if isinstance(values, list):
                         # Multiple values: use IN
-                        values_str = ", ".join(f"'{v}'" for v in values)
-                        conditions.append(f"{col} IN ({values_str})")
+                        conditions.append(f"{col} IN ({', '.join('?' * len(values))})")
+                        params.extend(values)
                     else:
                         # Single value
-                        conditions.append(f"{col} = '{values}'")
+                        conditions.append(f"{col} = ?")
+                        params.append(values)
 
         if not conditions:
-            return ""
+            return "", params
 
-        return "WHERE " + " AND ".join(conditions)
+        return "WHERE " + " AND ".join(conditions), params
 
     @staticmethod
     def _build_current_period_query(
-        intent: ParsedIntent,
         measure: "Measure",
-        bv: BusinessView,
-        context: BVContext,
-        tables: List[str],
+        from_clause: str,
+        where_clause: str,
     ) -> str:
         """Build query for current period aggregated metric value."""
         select_clause = f"SELECT {measure.expression} AS metric_value"
-        from_clause = TQLPlanner._build_from_clause(tables, bv)
-        where_clause = TQLPlanner._build_where_clause(intent, bv, is_baseline=False)
 
         query_parts = [select_clause, from_clause]
         if where_clause:
@@ -254,16 +499,12 @@ class TQLPlanner:
 
     @staticmethod
     def _build_baseline_period_query(
-        intent: ParsedIntent,
         measure: "Measure",
-        bv: BusinessView,
-        context: BVContext,
-        tables: List[str],
+        from_clause: str,
+        where_clause: str,
     ) -> str:
         """Build query for baseline period aggregated metric value."""
         select_clause = f"SELECT {measure.expression} AS metric_value"
-        from_clause = TQLPlanner._build_from_clause(tables, bv)
-        where_clause = TQLPlanner._build_where_clause(intent, bv, is_baseline=True)
 
         query_parts = [select_clause, from_clause]
         if where_clause:
@@ -275,18 +516,13 @@ class TQLPlanner:
 
     @staticmethod
     def _build_timeseries_query(
-        intent: ParsedIntent,
         measure: "Measure",
-        bv: BusinessView,
-        context: BVContext,
-        tables: List[str],
+        time_col: str,
+        from_clause: str,
+        where_clause: str,
     ) -> str:
         """Build time-series query for ARIMA detection."""
-        time_col = bv.time_dimension.full_column_name
-
         select_clause = f"SELECT {time_col} AS date, {measure.expression} AS value"
-        from_clause = TQLPlanner._build_from_clause(tables, bv)
-        where_clause = TQLPlanner._build_where_clause(intent, bv, is_baseline=False)
         group_by_clause = f"GROUP BY {time_col}"
         order_by_clause = f"ORDER BY {time_col}"
 
@@ -302,35 +538,33 @@ class TQLPlanner:
 
     @staticmethod
     def _build_dimensional_breakdown_query(
-        intent: ParsedIntent,
         measure: "Measure",
-        bv: BusinessView,
-        context: BVContext,
-        tables: List[str],
+        dimensions: List[Dimension],
+        from_clause: str,
+        where_clause: str,
         is_baseline: bool = False,
+        column_refs: Optional[Dict[str, str]] = None,
     ) -> str:
         """Build dimensional breakdown query for RCA."""
+        column_refs = column_refs or {}
         # Select all dimensions and the measure
-        dimension_cols = [dim.full_column_name for dim in bv.dimensions]
-        dimension_names = [dim.name for dim in bv.dimensions]
+        dimension_cols = [column_refs.get(dim.full_column_name, dim.full_column_name) for dim in dimensions]
+        dimension_names = [dim.name for dim in dimensions]
 
         # Build SELECT with dimension aliases
         select_parts = []
-        for dim in bv.dimensions:
-            select_parts.append(f"{dim.full_column_name} AS {dim.name}")
+        for dim, col in zip(dimensions, dimension_cols):
+            select_parts.append(f"{col} AS {dim.name}")
         select_parts.append(f"{measure.expression} AS metric_value")
 
         select_clause = "SELECT " + ", ".join(select_parts)
-        from_clause = TQLPlanner._build_from_clause(tables, bv)
-        where_clause = TQLPlanner._build_where_clause(intent, bv, is_baseline=is_baseline)
-
-        # Group by all dimensions
-        group_by_clause = "GROUP BY " + ", ".join(dimension_cols)
 
         query_parts = [select_clause, from_clause]
         if where_clause:
             query_parts.append(where_clause)
-        query_parts.append(group_by_clause)
+        if dimension_cols:
+            # Group by all dimensions
+            query_parts.append("GROUP BY " + ", ".join(dimension_cols))
 
         query = "\n".join(query_parts)
         logger.debug(
@@ -87,72 +87,63 @@ def generate_mock_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.D
         })
     customer_dim = pd.DataFrame(customers)
 
-    # Generate sales fact table with realistic patterns
-    np.random.seed(42)
-    sales_records = []
-    sale_id = 1
-
-    for date_id in date_dim['date_id']:
-        # Number of transactions per day varies
-        num_transactions = np.random.poisson(20)
-
-        current_date = date_dim[date_dim['date_id'] == date_id]['date'].iloc[0]
-
-        # Introduce a significant drop in APAC region for last 8 weeks of 2024
-        # and a spike in Enterprise segment in November 2024
-        apac_multiplier = 1.0
-        enterprise_multiplier = 1.0
-
-        if current_date >= datetime(2024, 11, 1):
-            # Last 8 weeks (Nov-Dec 2024): APAC drops by ~20%
-            if current_date >= datetime(2024, 11, 1):
-                apac_multiplier = 0.75
-
-            # Enterprise spike in November
-            if datetime(2024, 11, 1) <= current_date < datetime(2024, 12, 1):
-                enterprise_multiplier = 1.4
-
-        for _ in range(num_transactions):
-            product_id = np.random.choice(product_dim['product_id'])
-            customer_id = np.random.choice(customer_dim['customer_id'])
-            region_id = np.random.choice(region_dim['region_id'])
-
-            # Get customer segment
-            segment = customer_dim[customer_dim['customer_id'] == customer_id]['segment'].iloc[0]
-
-            # Base revenue varies by product category
-            product = product_dim[product_dim['product_id'] == product_id].iloc[0]
-            if product['category'] == 'Electronics':
-                base_revenue = np.random.uniform(500, 2000)
-            elif product['category'] == 'Furniture':
-                base_revenue = np.random.uniform(200, 800)
-            else:
-                base_revenue = np.random.uniform(10, 100)
-
-            # Apply multipliers
-            if region_id in [5, 6]:  # APAC
-                base_revenue *= apac_multiplier
-
-            if segment == 'Enterprise':
-                base_revenue *= enterprise_multiplier * 1.5  # Enterprise generally spends more
-
-            quantity = np.random.randint(1, 5)
-            revenue = base_revenue * quantity
-            cost = revenue * np.random.uniform(0.6, 0.8)  # 20-40% profit margin
-
-            sales_records.append({
-                'sale_id': sale_id,
-                'date_id': date_id,
-                'product_id': product_id,
-                'customer_id': customer_id,
-                'region_id': region_id,
-                'revenue': round(revenue, 2),
-                'quantity': quantity,
-                'cost': round(cost, 2),
-            })
-            sale_id += 1
-
-    sales_fact = pd.DataFrame(sales_records)
+    # Generate sales fact table with realistic patterns, drawing every
+    # transaction's attributes at once instead of row by row
+    rng = np.random.default_rng(42)
+
+    # Number of transactions per day varies
+    transactions_per_day = rng.poisson(20, size=len(date_dim))
+    num_sales = int(transactions_per_day.sum())
+    date_ids = np.repeat(date_dim['date_id'].to_numpy(), transactions_per_day)
+
+    product_ids = rng.choice(product_dim['product_id'].to_numpy(), size=num_sales)
+    customer_ids = rng.choice(customer_dim['customer_id'].to_numpy(), size=num_sales)
+    region_ids = rng.choice(region_dim['region_id'].to_numpy(), size=num_sales)
+
+    # Customer segment and product category of each sale
+    segment = customer_dim.set_index('customer_id')['segment'].loc[customer_ids].to_numpy()
+    category = product_dim.set_index('product_id')['category'].loc[product_ids].to_numpy()
+
+    # Base revenue varies by product category
+    base_revenue = np.select(
+        [category == 'Electronics', category == 'Furniture'],
+        [rng.uniform(500, 2000, num_sales), rng.uniform(200, 800, num_sales)],
+        default=rng.uniform(10, 100, num_sales),
+    )
+
+    # Introduce a significant drop in APAC region for last 8 weeks of 2024
+    # and a spike in Enterprise segment in November 2024. The multipliers
+    # depend only on the day, so they are computed per day and repeated
+    # like the date ids
+    day_dates = date_dim['date'].to_numpy()
+    in_last_two_months = day_dates >= np.datetime64('2024-11-01')
+    in_november = in_last_two_months & (day_dates < np.datetime64('2024-12-01'))
+    apac_multiplier = np.repeat(np.where(in_last_two_months, 0.75, 1.0), transactions_per_day)
+    enterprise_multiplier = np.repeat(np.where(in_november, 1.4, 1.0), transactions_per_day)
+
+    # Last 8 weeks (Nov-Dec 2024): APAC drops by ~20%
+    is_apac = np.isin(region_ids, [5, 6])
+    # Enterprise generally spends more, and spikes in November
+    is_enterprise = segment == 'Enterprise'
+    base_revenue *= np.where(is_apac, apac_multiplier, 1.0)
+    base_revenue *= np.where(is_enterprise, enterprise_multiplier * 1.5, 1.0)
+
+    quantity = rng.integers(1, 5, size=num_sales)
+    revenue = base_revenue * quantity
+    cost = revenue * rng.uniform(0.6, 0.8, num_sales)  # 20-40% profit margin
+
+    # Typed columns (int32 ids and quantities, float64 amounts) go straight
+    # into the frame without per-row dtype inference
+    sales_fact = pd.DataFrame({
+        'sale_id': np.arange(1, num_sales + 1, dtype=np.int32),
+        'date_id': date_ids.astype(np.int32),
+        'product_id': product_ids.astype(np.int32),
+        'customer_id': customer_ids.astype(np.int32),
+        'region_id': region_ids.astype(np.int32),
+        'revenue': revenue.round(2),
+        'quantity': quantity.astype(np.int32),
+        'cost': cost.round(2),
+    })
 
     return sales_fact, date_dim, product_dim, customer_dim, region_dim
 
@@ -169,10 +160,33 @@ def create_sqlite_database(db_path: str = "tellius_feed.db"):
 
     # Create database connection
     conn = sqlite3.connect(db_path)
-
-    # Write data to SQLite
-    sales_fact.to_sql('sales_fact', conn, if_exists='replace', index=False)
-    date_dim.to_sql('date_dim', conn, if_exists='replace', index=False)
+    # The file is rebuilt from scratch, so a crash mid-load loses nothing
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    # Bulk-load the fact table in one transaction; its indexes are created
+    # after the load
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS sales_fact")
+        conn.execute("""
+            CREATE TABLE sales_fact (
+                sale_id INTEGER, date_id INTEGER, product_id INTEGER, customer_id INTEGER,
+                region_id INTEGER, revenue REAL, quantity INTEGER, cost REAL
+            )
+        """)
+        # tolist() yields Python ints/floats, which sqlite3 can bind
+        conn.executemany(
+            "INSERT INTO sales_fact VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(*(sales_fact[column].tolist() for column in sales_fact.columns)),
+        )
+
+    # Write dimensions to SQLite
+    # Dates as 'YYYY-MM-DD' text (to_sql would write 'YYYY-MM-DD 00:00:00'),
+    # so "date BETWEEN '...' AND 'end'" includes the end date and compares
+    # 10 instead of 19 characters
+    date_dim.assign(date=date_dim['date'].dt.strftime('%Y-%m-%d')).to_sql(
+        'date_dim', conn, if_exists='replace', index=False
+    )
     product_dim.to_sql('product_dim', conn, if_exists='replace', index=False)
     customer_dim.to_sql('customer_dim', conn, if_exists='replace', index=False)
     region_dim.to_sql('region_dim', conn, if_exists='replace', index=False)
@@ -180,14 +194,49 @@ def create_sqlite_database(db_path: str = "tellius_feed.db"):
     # Create indexes for better query performance
     cursor = conn.cursor()
 
-    # Indexes on foreign keys
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales_fact(date_id)")
+    # Indexes on foreign keys; generated queries restrict sales to a date
+    # range first, so the date-led composites serve date + region/product
+    # predicates (and plain date_id lookups) from one index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_date_region ON sales_fact(date_id, region_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_date_product ON sales_fact(date_id, product_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_product ON sales_fact(product_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales_fact(customer_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_region ON sales_fact(region_id)")
 
-    # Index on date column for time-series queries
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_date_date ON date_dim(date)")
+    # Index on date column for time-series queries; covers the date_id join
+    # key so the date-range lookup never touches the table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_date_date ON date_dim(date, date_id)")
+
+    # Dimension columns used in filters and breakdowns
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_category ON product_dim(category, sub_category)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_segment ON customer_dim(segment)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_region_name ON region_dim(region_name, country)")
+
+    # Fact table with the dimension columns joined in, so plans can skip
+    # the joins (see the sample BV's denormalized_tables)
+    cursor.execute("DROP TABLE IF EXISTS sales_fact_denorm")
+    cursor.execute("""
+        CREATE TABLE sales_fact_denorm AS
+        SELECT sf.*,
+               d.date AS date_dim_date,
+               p.product_name AS product_dim_product_name,
+               p.category AS product_dim_category,
+               p.sub_category AS product_dim_sub_category,
+               p.brand AS product_dim_brand,
+               c.segment AS customer_dim_segment,
+               c.customer_name AS customer_dim_customer_name,
+               r.region_name AS region_dim_region_name,
+               r.country AS region_dim_country
+        FROM sales_fact sf
+        JOIN date_dim d ON sf.date_id = d.date_id
+        JOIN product_dim p ON sf.product_id = p.product_id
+        JOIN customer_dim c ON sf.customer_id = c.customer_id
+        JOIN region_dim r ON sf.region_id = r.region_id
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_denorm_date ON sales_fact_denorm(date_dim_date)")
+
+    # Table and index statistics for the query planner's join ordering
+    cursor.execute("ANALYZE")
 
     conn.commit()
     conn.close()
@@ -108,9 +108,13 @@ def generate_pharma_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd
     # Generate sales fact table
     sales_records = []
     sale_id = 1
+
+    # Hash lookups instead of filtering the dimension frames for every row
+    date_by_id = dict(zip(pharma_date_dim['date_id'], pharma_date_dim['date']))
+    unit_price_by_drug = dict(zip(drug_dim['drug_id'], drug_dim['unit_price']))
     
     for date_id in pharma_date_dim['date_id']:
-        current_date = pharma_date_dim[pharma_date_dim['date_id'] == date_id]['date'].iloc[0]
+        current_date = date_by_id[date_id]
         
         # Seasonal and trend multipliers
         month = current_date.month
@@ -131,7 +135,6 @@ def generate_pharma_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd
         
         for _ in range(num_transactions):
             drug_id = np.random.choice(drug_dim['drug_id'])
-            drug_info = drug_dim[drug_dim['drug_id'] == drug_id].iloc[0]
             therapeutic_area_id = drug_ta_map[drug_id]
             physician_id = np.random.choice(physician_dim['physician_id'])
             region_id = np.random.choice(pharma_region_dim['region_id'])
@@ -149,7 +152,7 @@ def generate_pharma_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd
             if units_sold < 1:
                 units_sold = 1
                 
-            revenue = units_sold * drug_info['unit_price'] * np.random.uniform(0.85, 1.15)
+            revenue = units_sold * unit_price_by_drug[drug_id] * np.random.uniform(0.85, 1.15)
             prescriptions = np.random.randint(1, units_sold + 1)
             rebates = revenue * np.random.uniform(0.15, 0.35)  # 15-35% rebates
             
@@ -191,7 +194,10 @@ def add_pharma_tables_to_database(db_path: str = "tellius_feed.db"):
     therapeutic_area_dim.to_sql('therapeutic_area_dim', conn, if_exists='replace', index=False)
     physician_dim.to_sql('physician_dim', conn, if_exists='replace', index=False)
     pharma_region_dim.to_sql('pharma_region_dim', conn, if_exists='replace', index=False)
-    pharma_date_dim.to_sql('pharma_date_dim', conn, if_exists='replace', index=False)
+    # Dates as 'YYYY-MM-DD' text, so BETWEEN includes the end date
+    pharma_date_dim.assign(date=pharma_date_dim['date'].dt.strftime('%Y-%m-%d')).to_sql(
+        'pharma_date_dim', conn, if_exists='replace', index=False
+    )
     
     # Create indexes
     cursor = conn.cursor()
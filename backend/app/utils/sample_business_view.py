@@ -7,6 +7,7 @@ from app.models.business_view import (
     ColumnType,
     Join,
     JoinType,
+    DenormalizedTable,
     Measure,
     Dimension,
     TimeDimension,
@@ -234,6 +235,26 @@ def create_sample_business_view() -> BusinessView:
         week_start=WeekStart.MONDAY
     )
 
+    # Fact table with every dimension column joined in (built by
+    # create_sqlite_database), for join-free plans
+    denormalized_tables = [
+        DenormalizedTable(
+            table="sales_fact_denorm",
+            source_table="sales_fact",
+            columns={
+                "date_dim.date": "date_dim_date",
+                "product_dim.product_name": "product_dim_product_name",
+                "product_dim.category": "product_dim_category",
+                "product_dim.sub_category": "product_dim_sub_category",
+                "product_dim.brand": "product_dim_brand",
+                "customer_dim.segment": "customer_dim_segment",
+                "customer_dim.customer_name": "customer_dim_customer_name",
+                "region_dim.region_name": "region_dim_region_name",
+                "region_dim.country": "region_dim_country",
+            },
+        ),
+    ]
+
     # Create Business View
     business_view = BusinessView(
         id="bv_ecommerce_sales",
@@ -250,6 +271,7 @@ def create_sample_business_view() -> BusinessView:
         dimensions=dimensions,
         time_dimension=time_dimension,
         calendar_rules=calendar_rules,
+        denormalized_tables=denormalized_tables,
         description="Business view for analyzing e-commerce sales data"
     )
 
@@ -0,0 +1,179 @@
+"""Tests for the FastPathParser question templates."""
+
+import pytest
+from datetime import date
+
+from app.models.intent import BaselineType
+from app.services.bv_context_builder import BVContextBuilder
+from app.services.question_parser import FastPathParser
+from app.services.llm_sql_generator import LLMSQLGenerator
+from app.utils.sample_business_view import SAMPLE_BUSINESS_VIEW
+
+TODAY = date(2024, 5, 15)
+
+
+@pytest.fixture
+def bv_context():
+    """BV context of the sample e-commerce Business View."""
+    return BVContextBuilder.build(SAMPLE_BUSINESS_VIEW)
+
+
+class TestRelativeWindow:
+    """Tests for "<metric> last N days|weeks|months"."""
+
+    def test_days(self, bv_context):
+        """Test a day window ending today."""
+        parsed = FastPathParser.try_parse("Revenue last 7 days", bv_context, TODAY)
+
+        assert parsed["metric"] == "Revenue"
+        assert parsed["time_range"] == {
+            "start_date": "2024-05-09",
+            "end_date": "2024-05-15",
+            "granularity": "day",
+        }
+        assert parsed["feed_type"] == "absolute"
+        assert parsed["filters"] == {}
+        assert parsed["baseline"] is None
+
+    def test_weeks(self, bv_context):
+        """Test a week window and the optional wording around it."""
+        parsed = FastPathParser.try_parse("Show me  profit over the last 2 weeks?", bv_context, TODAY)
+
+        assert parsed["metric"] == "Profit"
+        assert parsed["time_range"]["start_date"] == "2024-05-02"
+        assert parsed["time_range"]["end_date"] == "2024-05-15"
+        assert parsed["time_range"]["granularity"] == "week"
+
+    def test_months(self, bv_context):
+        """Test a month window and a measure name written with spaces."""
+        parsed = FastPathParser.try_parse("order count in the past 3 months", bv_context, TODAY)
+
+        assert parsed["metric"] == "Order_Count"
+        assert parsed["time_range"]["start_date"] == "2024-02-16"
+        assert parsed["time_range"]["granularity"] == "month"
+
+    def test_months_clamped_to_month_end(self, bv_context):
+        """Test that the month window start is clamped to a shorter month."""
+        parsed = FastPathParser.try_parse("revenue last 3 months", bv_context, date(2024, 5, 31))
+
+        # Feb 29 (clamped from the 31st) plus one day
+        assert parsed["time_range"]["start_date"] == "2024-03-01"
+
+    def test_relative_windows_disabled(self, bv_context):
+        """Test that relative windows can be left to the LLM."""
+        parsed = FastPathParser.try_parse(
+            "revenue last 3 months", bv_context, date(2026, 10, 16), relative_windows=False
+        )
+
+        assert parsed is None
+        assert FastPathParser.try_parse(
+            "revenue in Q4 2024", bv_context, date(2026, 10, 16), relative_windows=False
+        ) is not None
+
+    def test_zero_count_falls_through(self, bv_context):
+        """Test that an empty window is left to the LLM."""
+        assert FastPathParser.try_parse("revenue last 0 days", bv_context, TODAY) is None
+
+
+class TestQuarter:
+    """Tests for "<metric> in Q<n> YYYY"."""
+
+    @pytest.mark.parametrize(
+        "question, start_date, end_date",
+        [
+            ("revenue in Q1 2024", "2024-01-01", "2024-03-31"),
+            ("revenue in q2 2024", "2024-04-01", "2024-06-30"),
+            ("revenue during Q3 2023", "2023-07-01", "2023-09-30"),
+            ("revenue for Q4 2023", "2023-10-01", "2023-12-31"),
+        ],
+    )
+    def test_quarter_bounds(self, bv_context, question, start_date, end_date):
+        """Test the first and last day of each quarter."""
+        parsed = FastPathParser.try_parse(question, bv_context, TODAY)
+
+        assert parsed["time_range"] == {
+            "start_date": start_date,
+            "end_date": end_date,
+            "granularity": "week",
+        }
+
+    def test_invalid_quarter_falls_through(self, bv_context):
+        """Test that a quarter outside 1-4 is left to the LLM."""
+        assert FastPathParser.try_parse("revenue in Q5 2024", bv_context, TODAY) is None
+
+
+class TestFallThrough:
+    """Tests for questions the templates must leave to the LLM."""
+
+    @pytest.mark.parametrize(
+        "question",
+        [
+            "margin last 7 days",
+            "gross margin in Q1 2024",
+            "revenue last 7 days in APAC",
+            "why did revenue drop in Q3 2024",
+            "revenue in Q3 2024 vs last year",
+        ],
+    )
+    def test_falls_through(self, bv_context, question):
+        """Test unknown metrics and extra clauses."""
+        assert FastPathParser.try_parse(question, bv_context, TODAY) is None
+
+
+class TestAnomalyPrefix:
+    """Tests for the "anomalies in" prefix."""
+
+    @pytest.mark.parametrize(
+        "question",
+        [
+            "Anomalies in revenue last 30 days",
+            "show me anomaly in revenue over the last 4 weeks",
+            "unusual activity in revenue in Q2 2024",
+        ],
+    )
+    def test_prefix_selects_arima(self, bv_context, question):
+        """Test that the prefix switches the feed type to ARIMA."""
+        parsed = FastPathParser.try_parse(question, bv_context, TODAY)
+
+        assert parsed["metric"] == "Revenue"
+        assert parsed["feed_type"] == "arima"
+
+    def test_prefix_with_unknown_metric_falls_through(self, bv_context):
+        """Test that the prefix does not rescue an unknown metric."""
+        assert FastPathParser.try_parse("anomalies in margin last 7 days", bv_context, TODAY) is None
+
+
+class TestGeneratorFastPath:
+    """Tests for LLMSQLGenerator answering template questions without the LLM."""
+
+    @pytest.mark.asyncio
+    async def test_generate_skips_llm(self, bv_context, monkeypatch):
+        """Test that a template question is planned without touching the client."""
+        monkeypatch.setattr("app.services.llm_sql_generator.get_async_client", lambda provider: None)
+        generator = LLMSQLGenerator()
+
+        response = await generator.generate("anomalies in revenue in Q2 2024", bv_context)
+
+        assert response.parsed_intent.metric == "Revenue"
+        assert response.parsed_intent.time_range.start_date == date(2024, 4, 1)
+        assert response.tql_plan.timeseries_query is not None
+        assert response.tql_plan.baseline_period_query is not None
+
+    def test_relative_window_left_to_llm(self, bv_context, monkeypatch):
+        """Test that "last N months" is not resolved against a date past the data."""
+        monkeypatch.setattr("app.services.llm_sql_generator.get_async_client", lambda provider: None)
+        monkeypatch.setattr("app.services.llm_sql_generator._today_iso", lambda: "2026-10-16")
+        generator = LLMSQLGenerator()
+
+        assert generator._fast_path_response("revenue last 3 months", bv_context) is None
+
+    def test_quarter_gets_default_baseline(self, bv_context, monkeypatch):
+        """Test that a fast-path quarter carries the LLM's default last_year baseline."""
+        monkeypatch.setattr("app.services.llm_sql_generator.get_async_client", lambda provider: None)
+        monkeypatch.setattr("app.services.llm_sql_generator._today_iso", lambda: "2026-10-16")
+        generator = LLMSQLGenerator()
+
+        response = generator._fast_path_response("revenue in Q4 2024", bv_context)
+
+        assert response.parsed_intent.time_range.end_date == date(2024, 12, 31)
+        assert response.parsed_intent.baseline.type == BaselineType.LAST_YEAR
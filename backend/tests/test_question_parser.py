@@ -0,0 +1,87 @@
+"""Tests for QuestionParser's streamed LLM response handling."""
+
+import pytest
+
+from app.services.bv_context_builder import BVContextBuilder
+from app.services.question_parser import QuestionParser, _JSONObjectEnd
+from app.utils.sample_business_view import SAMPLE_BUSINESS_VIEW
+
+
+def _feed(chunks):
+    """Feed chunks until the tracker reports the object closed; returns (tracker, text read)."""
+    tracker = _JSONObjectEnd()
+    for index, chunk in enumerate(chunks):
+        if tracker.feed(chunk):
+            return tracker, "".join(chunks[:index + 1])
+    return tracker, "".join(chunks)
+
+
+class TestJSONObjectEnd:
+    """Tests for finding the end of the first streamed JSON object."""
+
+    def test_object_end_across_chunks(self):
+        """Test that the object is delimited across chunk boundaries."""
+        tracker, text = _feed(['Here is "the" ```json\n{"a": "x}', ' {y", "b": {"c"', ": 1}} trailing", "unread"])
+
+        assert tracker.end is not None
+        assert text[tracker.start:tracker.end] == '{"a": "x} {y", "b": {"c": 1}}'
+
+    def test_object_end_ignores_escaped_quotes(self):
+        """Test that escaped quotes do not end a string."""
+        tracker, text = _feed(['{"a": "say \\"}\\""', ', "b": 2}'])
+
+        assert text[tracker.start:tracker.end] == '{"a": "say \\"}\\"", "b": 2}'
+
+    def test_object_end_incomplete(self):
+        """Test that an unclosed object is not reported complete."""
+        tracker, _ = _feed(["} stray ", '{"a": {"b": 1}', ', "c": "}"'])
+
+        assert tracker.start == 8
+        assert tracker.end is None
+
+
+class TestStreamedParse:
+    """Tests for QuestionParser.parse reading the stream."""
+
+    @pytest.mark.asyncio
+    async def test_stops_reading_after_object(self, monkeypatch):
+        """Test that the stream is closed once the JSON object is complete."""
+        monkeypatch.setattr("app.services.question_parser.get_async_client", lambda provider: None)
+        parser = QuestionParser()
+        chunks = [
+            '```json\n{"metric": "Revenue", "time_range": {"start_date": "2024-01-01", ',
+            '"end_date": "2024-03-31", "granularity": "week"}, "filters": {"Region": "APAC"}, ',
+            '"baseline": null, "feed_type": "absolute", "threshold": null}\n```',
+            "\nThe question asks about revenue in APAC.",
+        ]
+        read = []
+
+        async def stream_completion(static_prefix, dynamic_suffix):
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+        monkeypatch.setattr(parser, "_stream_completion", stream_completion)
+
+        intent = await parser.parse(
+            "why did revenue drop in APAC in Q1 2024", BVContextBuilder.build(SAMPLE_BUSINESS_VIEW)
+        )
+
+        assert intent.metric == "Revenue"
+        assert intent.filters == {"Region": "APAC"}
+        assert len(read) == 3
+
+
+class TestParseCacheKey:
+    """Tests for the parse cache key."""
+
+    def test_keeps_case_of_filter_values(self):
+        """Test that questions differing only in case are cached separately."""
+        bv_context = BVContextBuilder.build(SAMPLE_BUSINESS_VIEW)
+
+        assert QuestionParser._cache_key("revenue in US", bv_context) != QuestionParser._cache_key(
+            "revenue in us", bv_context
+        )
+        assert QuestionParser._cache_key("revenue  in US?", bv_context) == QuestionParser._cache_key(
+            "revenue in US", bv_context
+        )